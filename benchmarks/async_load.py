@@ -0,0 +1,134 @@
+"""
+Asyncio companion server load test.
+
+Starts the asyncio web server on a local port, connects N /stream clients
+(raw sockets, all driven by one client event loop in this process), pushes
+library slides and measures how long each slide takes to reach every client.
+Asserts that every client receives every slide and that the server runs on
+a fixed number of threads whatever N is, and reports memory per client.
+
+    python benchmarks/async_load.py [--clients 500] [--slides 10]
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import threading
+import time
+
+from sse_fanout import library_slides
+
+from ucworship import web_server
+from ucworship.async_server import AsyncWebServer
+
+
+def rss_mb():
+    """Current resident memory of this process (both server and clients)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, not current
+
+
+async def open_stream(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+    head = await reader.readuntil(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200"), head
+    await reader.readuntil(b"\n\n")  # the current slide, sent on connect
+    return reader, writer
+
+
+async def next_slide(reader):
+    """The slide id of the next event on a stream (heartbeats skipped)."""
+    while True:
+        event = await reader.readuntil(b"\n\n")
+        if event.startswith(b"data: "):
+            return json.loads(event[len(b"data: ") :])["slide"]
+
+
+async def run(clients, slides):
+    server = AsyncWebServer("127.0.0.1", 0).start()
+    # Start web_server's encoder thread before taking the baseline
+    title, image = slides[0]
+    web_server.push_image(image, title=title)
+    web_server.wait_idle()
+    threads_idle = threading.active_count()
+    rss_idle = rss_mb()
+
+    start = time.perf_counter()
+    streams = await asyncio.gather(*(open_stream(server.port) for _ in range(clients)))
+    connect_s = time.perf_counter() - start
+    await asyncio.sleep(0.1)
+    assert server.stats()["clients"] == clients, server.stats()
+
+    latencies = []
+    for title, image in slides:
+        waiting = [asyncio.ensure_future(next_slide(reader)) for reader, _ in streams]
+        start = time.perf_counter()
+        web_server.push_image(image, title=title, slide_type="image")
+        received = await asyncio.gather(*waiting)
+        latencies.append((time.perf_counter() - start) * 1000)
+        expected = json.loads(web_server.current_frame()[len(b"data: ") :])["slide"]
+        assert all(slide == expected for slide in received), "a client missed the slide"
+
+    threads_loaded = threading.active_count()
+    rss_loaded = rss_mb()
+    stats = server.stats()
+    for _, writer in streams:
+        writer.close()
+    server.shutdown()
+    return {
+        "connect_s": connect_s,
+        "latencies": latencies,
+        "threads": (threads_idle, threads_loaded),
+        "rss": (rss_idle, rss_loaded),
+        "stats": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500, help="concurrent /stream clients")
+    parser.add_argument("--slides", type=int, default=10, help="slides pushed to all clients")
+    args = parser.parse_args()
+
+    # Each client is two sockets here (client and server side)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.clients * 2 + 100
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    slides = library_slides(args.slides)
+
+    result = asyncio.run(run(args.clients, slides))
+    latencies = sorted(result["latencies"])
+    threads_idle, threads_loaded = result["threads"]
+    rss_idle, rss_loaded = result["rss"]
+    per_client_kb = (rss_loaded - rss_idle) * 1024 / args.clients
+
+    print(f"{args.clients} SSE clients connected in {result['connect_s']:.2f} s")
+    print(
+        f"{len(slides)} slides, from push to received by every client (encode included): "
+        f"p50 {statistics.median(latencies):.1f} ms, max {latencies[-1]:.1f} ms"
+    )
+    print(f"threads: {threads_idle} with no clients, {threads_loaded} with {args.clients}")
+    print(
+        f"RSS: {rss_idle:.0f} MB -> {rss_loaded:.0f} MB "
+        f"({per_client_kb:.0f} KB per client, client sockets included)"
+    )
+    print(f"server: {result['stats']}")
+
+    assert threads_loaded == threads_idle, "the server started threads per client"
+    assert result["stats"]["dropped"] == 0
+    assert per_client_kb < 256, "memory per client is not bounded"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Export All throughput benchmark.
+
+Exports the bundled assets/txt_files library with 1, 2, 4, ... worker
+processes (up to the CPU count) and reports songs per second, bypassing the
+disk render cache so every song is really rendered.
+
+    python benchmarks/export_all.py [--limit N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from render_quality import BASE_PARAMS, SONGS_DIR
+
+from ucworship.exporter import ExportJob
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, help="only export the first N songs")
+    args = parser.parse_args()
+
+    songs = sorted(os.path.join(SONGS_DIR, f) for f in os.listdir(SONGS_DIR) if f.endswith(".txt"))
+    songs = songs[: args.limit] if args.limit else songs
+    params = dict(BASE_PARAMS, capo=0, transpose_steps=0, render_quality="high")
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({min(2**i, cpus) for i in range(cpus.bit_length() + 1)})
+    print(f"{len(songs)} songs, {cpus} CPUs\n")
+    print(f"{'workers':>8}{'seconds':>10}{'songs/s':>10}{'speedup':>10}")
+
+    baseline = None
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            job = ExportJob(songs, out_dir, params, max_workers=workers).start()
+            while not job.done:
+                time.sleep(0.05)
+            job.close()
+            elapsed = time.perf_counter() - start
+        if job.errors:
+            print(f"  {len(job.errors)} errors, first: {job.errors[0]}")
+        rate = len(songs) / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8}{elapsed:>10.2f}{rate:>10.2f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
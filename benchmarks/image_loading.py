@@ -0,0 +1,138 @@
+"""
+Image loading benchmark.
+
+Loads every image in the bundled assets/image_files library at projector size
+(1920x1080) and reports decode time and peak memory for each way of loading:
+
+    full    decode at full size, then downscale (what the app did before)
+    draft   JPEGs decoded straight at a reduced scale that covers 1920x1080
+    lazy    LazyImage: the header is read first, pixels decoded by load(box) when shown
+
+Each mode runs in its own process so its peak RSS is not mixed with the others.
+The cost of the header alone (what a LazyImage costs until it is shown) is
+reported separately.
+
+    python benchmarks/image_loading.py [--limit N]
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from PIL import Image
+
+from ucworship.image_proxies import PROXY_SIZES, LazyImage, decode_image, make_proxy
+
+_package_dir = os.path.join(os.path.dirname(__file__), "..", "ucworship")
+IMAGES_DIR = os.path.join(_package_dir, "assets", "image_files")
+MODES = ("full", "draft", "lazy")
+BOX = PROXY_SIZES["projector"]
+
+
+def library_images(limit=None, only_format=None):
+    paths = []
+    for name in sorted(os.listdir(IMAGES_DIR)):
+        path = os.path.join(IMAGES_DIR, name)
+        try:
+            with Image.open(path) as img:
+                fmt = img.format
+        except OSError:
+            continue  # not an image
+        if only_format in (None, fmt):
+            paths.append((path, fmt))
+    return paths[:limit]
+
+
+def load(path, mode):
+    if mode == "lazy":
+        lazy = LazyImage(path)
+        _ = lazy.size  # the header read the app does before showing it
+        img = lazy.load(BOX)
+    else:
+        img = decode_image(path, BOX) if mode == "draft" else decode_image(path)
+    return make_proxy(img, BOX).size
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS
+
+
+def run_mode(mode, limit, only_format):
+    """Child process: time every load and report it as JSON on stdout."""
+    baseline = peak_rss_mb()
+    timings = []
+    for path, fmt in library_images(limit, only_format):
+        start = time.perf_counter()
+        load(path, mode)
+        timings.append((fmt, time.perf_counter() - start))
+    print(json.dumps({"timings": timings, "baseline_mb": baseline, "peak_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, help="only load the first N images")
+    # Child process options
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--format", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args.mode, args.limit, args.format)
+        return
+
+    def child(mode, only_format=None):
+        cmd = [sys.executable, __file__, "--mode", mode]
+        if args.limit:
+            cmd += ["--limit", str(args.limit)]
+        if only_format:
+            cmd += ["--format", only_format]
+        return json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+
+    # Peak RSS over the whole library is set by the largest PNG; JPEGs get their own run
+    results = {mode: (child(mode), child(mode, "JPEG")) for mode in MODES}
+
+    # Checked after the child runs: Linux carries peak RSS over into exec'd children
+    # (a draft-decoded JPEG can round to one pixel off)
+    for path, _ in library_images(args.limit):
+        full = load(path, "full")
+        for mode in ("draft", "lazy"):
+            size = load(path, mode)
+            assert all(abs(a - b) <= 1 for a, b in zip(full, size, strict=True)), (path, mode)
+
+    count = len(results["full"][0]["timings"])
+    print(f"{count} images from {IMAGES_DIR}, loaded for a {BOX[0]}x{BOX[1]} display")
+    print("peak RSS is the growth over the interpreter's own, in MB\n")
+    print(
+        f"{'mode':<8}{'total s':>9}{'p50 ms':>9}{'max ms':>9}"
+        f"{'JPEG s':>9}{'peak RSS':>10}{'JPEG peak':>11}"
+    )
+    for mode, (result, jpeg) in results.items():
+        times = [t * 1000 for _, t in result["timings"]]
+        jpeg_s = sum(t for _, t in jpeg["timings"])
+        print(
+            f"{mode:<8}{sum(times) / 1000:>9.2f}{statistics.median(times):>9.1f}{max(times):>9.1f}"
+            f"{jpeg_s:>9.2f}{_growth(result):>10.0f}{_growth(jpeg):>11.0f}"
+        )
+
+    headers = []
+    for path, _ in library_images(args.limit):
+        start = time.perf_counter()
+        _ = LazyImage(path).size
+        headers.append((time.perf_counter() - start) * 1000)
+    print(
+        f"\nheader only (LazyImage before its pixels are needed): "
+        f"{sum(headers) / 1000:.2f} s total, p50 {statistics.median(headers):.2f} ms"
+    )
+
+
+def _growth(result):
+    return result["peak_mb"] - result["baseline_mb"]
+
+
+if __name__ == "__main__":
+    main()
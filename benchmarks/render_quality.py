@@ -0,0 +1,92 @@
+"""
+Render-quality benchmark.
+
+Renders every song in the bundled assets/txt_files library at each render
+quality and reports latency and how far the output drifts from the "high"
+(4x supersampled) reference.
+
+    python benchmarks/render_quality.py [--limit N]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import time
+
+from PIL import Image, ImageChops, ImageStat
+
+from ucworship.image_automation_script import RENDER_QUALITY, create_arabic_song_image
+from ucworship.songs import load_song
+
+_package_dir = os.path.join(os.path.dirname(__file__), "..", "ucworship")
+SONGS_DIR = os.path.join(_package_dir, "assets", "txt_files")
+FONTS_DIR = os.path.join(_package_dir, "assets", "fonts")
+
+# Mirrors the GUI defaults in SongSheetApp.__init__
+BASE_PARAMS = {
+    "lyric_font_size": 46,
+    "chord_font_size": 24,
+    "title_font_size": 32,
+    "capo_font_size": 14,
+    "show_chords": True,
+    "font_reg": os.path.join(FONTS_DIR, "NotoNaskhArabic-Regular.ttf"),
+    "font_bold": os.path.join(FONTS_DIR, "NotoNaskhArabic-Bold.ttf"),
+    "font_chord": os.path.join(FONTS_DIR, "ARIAL.TTF"),
+    "font_english": os.path.join(FONTS_DIR, "ARIAL.TTF"),
+    "font_english_bold": os.path.join(FONTS_DIR, "arial", "ARIALBD.TTF"),
+}
+
+
+def load_library(limit=None):
+    songs = []
+    for filename in sorted(os.listdir(SONGS_DIR)):
+        if not filename.endswith(".txt"):
+            continue
+        song = load_song(os.path.join(SONGS_DIR, filename))
+        songs.append((filename, song, song.capo or 0))
+    return songs[:limit] if limit else songs
+
+
+def mean_abs_diff(image, reference):
+    """Mean absolute per-channel difference (0-255) after matching sizes."""
+    if image.size != reference.size:
+        image = image.resize(reference.size, Image.Resampling.LANCZOS)
+    return sum(ImageStat.Stat(ImageChops.difference(image, reference)).mean) / 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, help="only render the first N songs")
+    args = parser.parse_args()
+
+    songs = load_library(args.limit)
+    qualities = sorted(RENDER_QUALITY, key=RENDER_QUALITY.get, reverse=True)
+    reference = {}
+    print(f"{len(songs)} songs\n")
+    print(f"{'quality':<10}{'scale':>6}{'mean ms':>10}{'p95 ms':>10}{'total s':>10}{'diff':>8}")
+
+    for quality in qualities:
+        latencies, diffs = [], []
+        for filename, song, capo in songs:
+            params = dict(BASE_PARAMS, capo=capo, render_quality=quality)
+            start = time.perf_counter()
+            image = create_arabic_song_image(song, params)
+            latencies.append(time.perf_counter() - start)
+            if quality == "high":
+                reference[filename] = image
+            else:
+                diffs.append(mean_abs_diff(image, reference[filename]))
+
+        latencies.sort()
+        p95 = latencies[math.ceil(len(latencies) * 0.95) - 1] if latencies else 0.0  # nearest rank
+        diff = f"{statistics.mean(diffs):.2f}" if diffs else "ref"
+        print(
+            f"{quality:<10}{RENDER_QUALITY[quality]:>5}x"
+            f"{statistics.mean(latencies) * 1000:>10.1f}{p95 * 1000:>10.1f}"
+            f"{sum(latencies):>10.2f}{diff:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Library search benchmark.
+
+Builds the search index over the bundled assets/txt_files library, copied
+until it holds --songs files, and reports per-query latency for title, lyric,
+multi-word and short queries against a linear scan over the same text.
+
+    python benchmarks/search.py [--songs N]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import time
+
+from render_quality import SONGS_DIR
+
+from ucworship.library_index import LibraryIndex, normalize
+from ucworship.songs import load_song
+
+
+def build_library(size):
+    """(name, song) pairs: the bundled songs, repeated under new names up to `size`."""
+    songs = [
+        (name, load_song(os.path.join(SONGS_DIR, name)))
+        for name in sorted(os.listdir(SONGS_DIR))
+        if name.endswith(".txt")
+    ]
+    library = []
+    for i in range(size):
+        name, song = songs[i % len(songs)]
+        copy = i // len(songs)
+        library.append((f"{name[:-4]} ({copy}).txt" if copy else name, song))
+    return library
+
+
+def sample_queries(library):
+    """Queries a user would type: titles, lyric fragments, two words, one or two letters."""
+    queries = []
+    for _, song in library[:: max(1, len(library) // 20)][:20]:
+        lines = [line.lyrics.strip() for line in song.lines() if line.lyrics.strip()]
+        queries.append(song.title[:6])
+        if lines:
+            middle = lines[len(lines) // 2]
+            queries.append(middle[len(middle) // 3 :][:8])
+            queries.append(" ".join(lines[-1].split()[:2]))
+    queries += ["a", "يس", "love", "الرب"]
+    return [q for q in queries if q.strip()]
+
+
+def timed(fn, queries, repeat=5):
+    latencies = []
+    for query in queries:
+        best = min(_time_once(fn, query) for _ in range(repeat))
+        latencies.append(best * 1e6)
+    return latencies
+
+
+def _time_once(fn, query):
+    start = time.perf_counter()
+    fn(query)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--songs", type=int, default=5000, help="library size to index")
+    args = parser.parse_args()
+
+    library = build_library(args.songs)
+    start = time.perf_counter()
+    index = LibraryIndex()
+    for name, song in library:
+        index.add(name, song)
+    build_s = time.perf_counter() - start
+
+    entries = [index._entries[name] for name, _ in library]
+
+    def linear_scan(query):
+        """The same matching rules as the index, checking every file."""
+        terms = normalize(query).split(" ")
+        if all(len(term) < 3 for term in terms):
+            return [
+                entry.name
+                for entry in entries
+                if all(any(w.startswith(t) for w in entry.head.split()) for t in terms)
+            ]
+        return [entry.name for entry in entries if all(term in entry.text for term in terms)]
+
+    queries = sample_queries(library)
+    for query in queries:
+        assert sorted(index.search(query)) == sorted(linear_scan(query)), query
+
+    print(f"{len(library)} songs indexed in {build_s:.2f} s, {len(queries)} queries\n")
+    print(f"{'method':<10}{'p50 us':>10}{'p95 us':>10}{'max us':>10}")
+    for name, fn in (("linear", linear_scan), ("index", index.search)):
+        latencies = sorted(timed(fn, queries))
+        p95 = latencies[math.ceil(len(latencies) * 0.95) - 1]  # nearest rank
+        print(f"{name:<10}{statistics.median(latencies):>10.0f}{p95:>10.0f}{latencies[-1]:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
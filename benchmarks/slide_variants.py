@@ -0,0 +1,67 @@
+"""
+Web companion slide variant benchmark.
+
+Pushes rendered songs from the bundled library to the web server and fetches
+every width/format variant the page can ask for, reporting average bytes per
+slide against the full 1800 px JPEG, and the cost of the first (encoding)
+and later (cached) requests.
+
+    python benchmarks/slide_variants.py [--limit N]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from render_quality import BASE_PARAMS, load_library
+
+from ucworship import web_server
+from ucworship.image_automation_script import create_arabic_song_image
+
+
+def fetch(client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, (url, response.status_code)
+    return len(response.data), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=10, help="number of songs to push")
+    args = parser.parse_args()
+
+    client = web_server.app.test_client()
+    ratios, kbs, first_ms, cached_ms = {}, {}, {}, {}
+    for name, song, capo in load_library(args.limit):
+        image = create_arabic_song_image(song, dict(BASE_PARAMS, capo=capo))
+        web_server.push_image(image, title=name)
+        web_server.wait_idle()
+        frame = json.loads(web_server._current_frame[len(b"data: ") :])
+        slide, widths = frame["slide"], frame["widths"]
+        full, _ = fetch(client, f"/slide/{slide}.jpg")
+        for width in widths:
+            for ext in ("jpg", "webp"):
+                url = f"/slide/{slide}-{width}.{ext}"
+                size, first = fetch(client, url)
+                _, cached = fetch(client, url)
+                label = (str(width) if width != widths[-1] else "full", ext)
+                ratios.setdefault(label, []).append(size / full)
+                kbs.setdefault(label, []).append(size / 1024)
+                first_ms.setdefault(label, []).append(first)
+                cached_ms.setdefault(label, []).append(cached)
+
+    print(f"{args.limit} songs; sizes relative to each slide's full-width JPEG\n")
+    print(f"{'variant':<12}{'slides':>7}{'KB':>7}{'vs full':>9}{'first ms':>10}{'cached ms':>11}")
+    for label in sorted(ratios, key=lambda lb: (lb[0] == "full", lb[0].zfill(5), lb[1])):
+        print(
+            f"{' '.join(label):<12}{len(ratios[label]):>7}{statistics.mean(kbs[label]):>7.0f}"
+            f"{statistics.mean(ratios[label]):>9.0%}{statistics.mean(first_ms[label]):>10.1f}"
+            f"{statistics.mean(cached_ms[label]):>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
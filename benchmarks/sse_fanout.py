@@ -0,0 +1,106 @@
+"""
+Web companion SSE fan-out benchmark.
+
+Connects N /stream clients to the web server (through Flask's test client, so
+no sockets are involved), pushes library slides and reports what a push
+costs the caller (the Tk thread), the encode time on the encoder thread and
+the cost of delivering the slide to every client, and how many pushes a burst
+coalesces. The one-frame-per-push guarantees are checked by
+tests/test_web_server.py.
+
+    python benchmarks/sse_fanout.py [--clients 1,15,100,500] [--slides N]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from PIL import Image
+
+from ucworship import web_server
+
+_package_dir = os.path.join(os.path.dirname(__file__), "..", "ucworship")
+IMAGES_DIR = os.path.join(_package_dir, "assets", "image_files")
+
+
+def library_slides(count):
+    slides = []
+    for name in sorted(os.listdir(IMAGES_DIR)):
+        try:
+            with Image.open(os.path.join(IMAGES_DIR, name)) as img:
+                slides.append((os.path.splitext(name)[0], img.convert("RGB")))
+        except OSError:
+            continue  # not an image
+        if len(slides) == count:
+            break
+    return slides
+
+
+def connect(client):
+    """Open a /stream and consume the frame sent on connect; returns the event iterator."""
+    events = iter(client.get("/stream", buffered=False).response)
+    next(events)
+    return events
+
+
+def run(clients, slides):
+    """Push every slide to `clients` connections; returns (push, encode, deliver) ms per slide."""
+    client = web_server.app.test_client()
+    streams = [connect(client) for _ in range(clients)]
+    push_ms, encode_ms, deliver_ms = [], [], []
+    for title, image in slides:
+        start = time.perf_counter()
+        web_server.push_image(image, title=title, slide_type="image")
+        push_ms.append((time.perf_counter() - start) * 1000)
+        web_server.wait_idle()
+        encode_ms.append(web_server.stats()["last_ms"])
+        pushed = time.perf_counter()
+        for events in streams:
+            next(events)
+        deliver_ms.append((time.perf_counter() - pushed) * 1000)
+    for events in streams:
+        events.close()
+    return push_ms, encode_ms, deliver_ms
+
+
+def check_slide_url(client):
+    """Fetch the current slide by hash, then revalidate it; returns (status, bytes) of each."""
+    slide_id = json.loads(web_server.current_frame()[len(b"data: ") :])["slide"]
+    first = client.get(f"/slide/{slide_id}.jpg")
+    again = client.get(f"/slide/{slide_id}.jpg", headers={"If-None-Match": first.headers["ETag"]})
+    return (first.status_code, len(first.data)), (again.status_code, len(again.data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", default="1,15,100,500", help="comma-separated client counts")
+    parser.add_argument("--slides", type=int, default=10, help="slides pushed per client count")
+    args = parser.parse_args()
+
+    slides = library_slides(args.slides)
+    print(f"{len(slides)} slides per run\n")
+    print(f"{'clients':>8}{'push ms':>10}{'encode ms':>11}{'deliver ms':>12}{'per client us':>15}")
+    for clients in (int(n) for n in args.clients.split(",")):
+        push, encode, deliver = (sum(ms) / len(ms) for ms in run(clients, slides))
+        print(
+            f"{clients:>8}{push:>10.3f}{encode:>11.1f}{deliver:>12.2f}"
+            f"{deliver * 1000 / clients:>15.1f}"
+        )
+
+    # A burst of pushes while the encoder is busy: only the latest is encoded
+    before = web_server.stats()
+    for title, image in slides:
+        web_server.push_image(image, title=title, slide_type="image")
+    web_server.wait_idle()
+    after = web_server.stats()
+    encoded = after["encoded"] - before["encoded"]
+    coalesced = after["coalesced"] - before["coalesced"]
+    print(f"\nBurst of {len(slides)} pushes: {encoded} encoded, {coalesced} coalesced")
+    print(f"SSE frame: {len(web_server.current_frame())} bytes")
+    (status, full), (again, revalidated) = check_slide_url(web_server.app.test_client())
+    print(f"/slide/<hash>.jpg: {status} with {full} bytes, then {again} with {revalidated} bytes")
+
+
+if __name__ == "__main__":
+    main()
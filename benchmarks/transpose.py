@@ -0,0 +1,98 @@
+"""
+Transposition micro-benchmark.
+
+Transposes every song in the bundled assets/txt_files library into all 12
+keys, once with the per-line regex approach the renderer used to take (regex
+substitution, then re-splitting the line into lyrics and chords) and once
+with the tokenized whole-song pass (Song.transposed), checks that both
+produce the same lines, and reports the time per library pass.
+
+    python benchmarks/transpose.py [--repeat N]
+"""
+
+import argparse
+import re
+import time
+
+from render_quality import load_library
+
+from ucworship.songs import MusicTheory
+
+_CHORD = re.compile(r"\[([A-G][b#]?[^\]]*)\]")
+_SPLIT = re.compile(r"(\[.*?\])")
+
+
+def _legacy_transpose_chord(chord_str, steps):
+    """The pre-tokenizer algorithm: two regex matches and list lookups per chord."""
+    if not chord_str or steps == 0:
+        return chord_str
+    match = re.match(r"^([A-G][b#]?)(.*)", chord_str)
+    if not match:
+        return chord_str
+    root, rest = match.group(1), match.group(2)
+    try:
+        idx, prefer_flat = MusicTheory._note_index(root)
+    except ValueError:
+        return chord_str
+    new_root = MusicTheory._index_to_note(idx + steps, prefer_flat)
+    slash_match = re.match(r"^(.*)/([A-G][b#]?)$", rest)
+    if slash_match:
+        quality, bass = slash_match.group(1), slash_match.group(2)
+        try:
+            bass_idx, _ = MusicTheory._note_index(bass)
+        except ValueError:
+            return f"{new_root}{quality}/{bass}"
+        return f"{new_root}{quality}/{MusicTheory._index_to_note(bass_idx + steps, prefer_flat)}"
+    return new_root + rest
+
+
+def _legacy_transpose_line(text, steps):
+    return _CHORD.sub(lambda m: f"[{_legacy_transpose_chord(m.group(1), steps)}]", text)
+
+
+def legacy_transpose(song, steps):
+    """Transposed chord names per line, the way the renderer used to get them."""
+    chords = []
+    for line in song.lines():
+        text = _legacy_transpose_line(line.text, steps)
+        chords.append(tuple(segment[1:-1] for segment in _SPLIT.split(text)[1::2]))
+    return chords
+
+
+def tokenized_transpose(song, steps):
+    return [line.chords for line in song.transposed(steps).lines()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="library passes per method")
+    args = parser.parse_args()
+
+    songs = [song for _, song, _ in load_library()]
+    chords = sum(len(line.chords) for song in songs for line in song.lines())
+    print(f"{len(songs)} songs, {chords} chords, 12 keys\n")
+
+    for song in songs:
+        for steps in range(12):
+            assert legacy_transpose(song, steps) == tokenized_transpose(song, steps), song.title
+            assert [line.text for line in song.transposed(steps).lines()] == [
+                _legacy_transpose_line(line.text, steps) for line in song.lines()
+            ], song.title
+
+    print(f"{'method':<12}{'ms/pass':>10}{'us/song/key':>14}{'speedup':>10}")
+    baseline = None
+    for name, transpose in (("regex", legacy_transpose), ("tokenized", tokenized_transpose)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for song in songs:
+                for steps in range(12):
+                    transpose(song, steps)
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        per_song = best / (len(songs) * 12) * 1e6
+        print(f"{name:<12}{best * 1000:>10.1f}{per_song:>14.1f}{baseline / best:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
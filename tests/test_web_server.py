@@ -0,0 +1,72 @@
+import json
+import queue
+
+import pytest
+from PIL import Image
+
+from ucworship import web_server
+
+CLIENTS = 50
+
+
+@pytest.fixture
+def clients():
+    queues = [queue.Queue() for _ in range(CLIENTS)]
+    for q in queues:
+        web_server.add_subscriber(q)
+    yield queues
+    for q in queues:
+        web_server.remove_subscriber(q)
+
+
+@pytest.fixture
+def sse_frame_calls(monkeypatch):
+    calls = []
+    sse_frame = web_server._sse_frame
+
+    def counting(payload):
+        calls.append(payload)
+        return sse_frame(payload)
+
+    monkeypatch.setattr(web_server, "_sse_frame", counting)
+    return calls
+
+
+def push(color, title):
+    web_server.push_image(Image.new("RGB", (320, 180), color), title=title)
+    assert web_server.wait_idle(timeout=10)
+
+
+def test_each_push_is_serialized_once_and_shared(clients, sse_frame_calls):
+    for color, title in [("red", "one"), ("green", "two"), ("blue", "three")]:
+        sse_frame_calls.clear()
+        push(color, title)
+
+        assert len(sse_frame_calls) == 1
+        frames = [q.get_nowait() for q in clients]
+        assert all(frame is frames[0] for frame in frames)
+        assert frames[0] is web_server.current_frame()
+        assert json.loads(frames[0][len(b"data: ") :])["title"] == title
+
+
+def test_frame_carries_the_slide_hash_not_the_image(clients):
+    push("white", "hash")
+
+    frame = clients[0].get_nowait()
+    assert len(frame) < 1024
+    slide = json.loads(frame[len(b"data: ") :])["slide"]
+    status, headers, body = web_server.slide_response(f"{slide}.jpg", lambda etag: False)
+    assert status == 200
+    assert body == web_server.current_image()
+    assert "immutable" in headers["Cache-Control"]
+
+
+def test_new_client_gets_the_prebuilt_frame(sse_frame_calls):
+    push("black", "connect")
+    sse_frame_calls.clear()
+
+    response = web_server.app.test_client().get("/stream", buffered=False)
+    events = iter(response.response)
+    assert next(events) is web_server.current_frame()
+    assert not sse_frame_calls
+    response.close()
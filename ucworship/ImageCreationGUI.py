@@ -1,3 +1,4 @@
+import bisect
 import os
 import re
 import shutil
@@ -12,6 +13,14 @@ from PIL import Image, ImageTk
 # Make sure 'image_automation_script.py' is in the same folder.
 from ucworship.image_automation_script import create_arabic_song_image
 from ucworship import web_server
+from ucworship.exporter import ExportJob
+from ucworship.image_proxies import ImageProxyCache, decode_image, resolve
+from ucworship.key_variants import KeyVariants, build_order, key_index
+from ucworship.library_index import LibraryIndex, normalize
+from ucworship.library_watcher import LibraryWatcher
+from ucworship.render_cache import DiskRenderCache, RenderCache, render_key
+from ucworship.render_worker import RenderScheduler
+from ucworship.songs import MusicTheory, invalidate_song, load_song
 
 def _get_bundle_dir():
     """Read-only assets (fonts, bundled defaults) — inside the frozen bundle or source tree."""
@@ -57,95 +66,46 @@ _init_user_data(_bundle_dir, _data_dir)
 fonts_dir = os.path.join(_bundle_dir, "assets", "fonts")
 song_dest = os.path.join(_data_dir, "assets", "txt_files")
 image_dest = os.path.join(_data_dir, "assets", "image_files")
+render_cache_dir = os.path.join(_data_dir, "cache", "renders")
+image_proxy_dir = os.path.join(_data_dir, "cache", "proxies")
 
+SEARCH_DEBOUNCE_MS = 150  # wait for a pause in typing before searching
+PERSIST_PRIORITY = 100  # disk cache writes run after previews, look-ahead and key builds
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
 
-# --- 1. Music Theory Engine ---
-# This class handles all chord transpositions for scale and capo adjustments.
-class MusicTheory:
-    CHROMATIC_SHARP = ["A", "A#", "B", "C", "C#", "D", "D#", "E", "F", "F#", "G", "G#"]
-    CHROMATIC_FLAT  = ["A", "Bb", "B", "C", "Db",  "D", "Eb",  "E", "F", "Gb",  "G", "Ab"]
 
-    @staticmethod
-    def _note_index(note):
-        """Return (semitone_index, prefer_flat) for a note string like 'A', 'Bb', 'C#'."""
-        if "#" in note:
-            return MusicTheory.CHROMATIC_SHARP.index(note), False
-        if "b" in note:
-            return MusicTheory.CHROMATIC_FLAT.index(note), True
-        # Natural note — same index in both scales
-        return MusicTheory.CHROMATIC_SHARP.index(note), False
-
-    @staticmethod
-    def _index_to_note(idx, prefer_flat):
-        """Return note name for a chromatic index, using flat or sharp based on preference."""
-        sharp = MusicTheory.CHROMATIC_SHARP[idx % 12]
-        flat  = MusicTheory.CHROMATIC_FLAT[idx % 12]
-        # Return flat only when preferred AND the note is actually an accidental (not natural)
-        return flat if (prefer_flat and flat != sharp) else sharp
-
-    @staticmethod
-    def _transpose_root(root, steps, prefer_flat):
-        """Transpose a single root note string by steps semitones."""
-        try:
-            idx, _ = MusicTheory._note_index(root)
-        except ValueError:
-            return root
-        return MusicTheory._index_to_note(idx + steps, prefer_flat)
-
-    @staticmethod
-    def transpose_chord(chord_str, steps):
-        """Transpose a full chord string by `steps` semitones.
-
-        Handles: Am, C#maj7, Bbsus4, G/B, F#m7b5, Dm7, Esus2, etc.
-        Preserves the flat/sharp preference of the original chord root.
-        Slash-chord bass notes (e.g. G/B) are also transposed.
-        """
-        if not chord_str or steps == 0:
-            return chord_str
+def _is_song_file(name):
+    return name.endswith(".txt")
 
-        match = re.match(r"^([A-G][b#]?)(.*)", chord_str)
-        if not match:
-            return chord_str
 
-        root = match.group(1)
-        rest = match.group(2)
+def _is_image_file(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
 
-        try:
-            idx, prefer_flat = MusicTheory._note_index(root)
-        except ValueError:
-            return chord_str
 
-        new_root = MusicTheory._index_to_note(idx + steps, prefer_flat)
+def _changed_range(old, new):
+    """Return (start, old_stop, new_stop): old[start:old_stop] must become new[start:new_stop].
 
-        # Handle slash chords: e.g. "G/B", "Am/E", "C#maj7/F"
-        slash_match = re.match(r"^(.*)/([A-G][b#]?)$", rest)
-        if slash_match:
-            quality = slash_match.group(1)
-            bass    = slash_match.group(2)
-            new_bass = MusicTheory._transpose_root(bass, steps, prefer_flat)
-            return f"{new_root}{quality}/{new_bass}"
+    Everything before `start` and after the stops is shared by both sequences.
+    """
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    return start, len(old) - end, len(new) - end
 
-        return new_root + rest
 
-    @staticmethod
-    def transpose_line(line, steps):
-        """Transpose all [chord] tokens in a lyric line in a single pass.
-
-        Uses regex substitution to avoid the double-replacement bug that occurs
-        when two chords in the same line share an enharmonic name after transposition.
-        """
-        if steps == 0:
-            return line
-        return re.sub(
-            r"\[([A-G][b#]?[^\]]*)\]",
-            lambda m: f"[{MusicTheory.transpose_chord(m.group(1), steps)}]",
-            line,
-        )
+# --- Main GUI Application ---
+class SongSheetApp(tk.Tk):
+    """The presenter window.
 
+    prefetch_ahead/prefetch_behind are how many session items after and before
+    the selection are pre-rendered; prefetch_budget caps their memory in bytes.
+    """
 
-# --- 2. Main GUI Application ---
-class SongSheetApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, prefetch_ahead=2, prefetch_behind=1, prefetch_budget=128 * 1024 * 1024):
         super().__init__()
         self.title("UCwOrship")
         self.geometry("1200x800")
@@ -159,18 +119,34 @@ class SongSheetApp(tk.Tk):
 
         # --- Initialize State & Parameters ---
         self.all_media_files = []  # A single list for all songs and images
+        self.library_index = LibraryIndex()  # search index over all_media_files
+        self._search_after_id = None  # pending debounced search
         self.current_mode = "song"  # Can be 'song' or 'image'
-        self.current_song_data = None
+        self.current_song = None
         self.current_media_name = ""
         self.current_file_path = ""
         self.original_capo = 0  # --- CHANGE 1: Added to store the capo from the file ---
-        self.pil_image = None  # To hold the original, full-resolution PIL image
+        self.pil_image = None  # The displayed slide (for images, the projector-sized proxy)
         self.pil_image_zoomed = None  # To hold the currently zoomed image for the projector
         self.projector_window = None  # To hold the external projector window
         self.projector_label = None
         self.projector_paused = False
         self.dark_mode = False
         self._pre_pause_snapshot = None  # saved state when pause is pressed
+        self.render_cache = RenderCache(max_bytes=256 * 1024 * 1024)
+        self.disk_render_cache = DiskRenderCache(render_cache_dir, max_bytes=512 * 1024 * 1024)
+        self.render_scheduler = RenderScheduler(lambda fn: self.after(0, fn))
+        self.image_proxies = ImageProxyCache(image_proxy_dir)
+
+        # --- Session look-ahead: pre-render neighbours of the selected session item ---
+        self.prefetch_ahead = prefetch_ahead  # items after the selection
+        self.prefetch_behind = prefetch_behind  # items before it
+        self.prefetch_cache = RenderCache(max_bytes=prefetch_budget)
+        self._prefetch_keys = set()
+
+        # --- All-12-keys variants of the selected song, built in the background ---
+        self.key_variants_level = "layout"  # "off", "song", "layout" or "render"
+        self.key_variants = None  # KeyVariants for the current song, dropped on deselect
 
         # --- Theme Colors ---
         self.LIGHT = {
@@ -203,7 +179,7 @@ class SongSheetApp(tk.Tk):
             "capo": tk.IntVar(value=0),
             "scale_steps": tk.IntVar(value=0),
             "show_chords": tk.BooleanVar(value=True),
-            "scale_factor": 5,
+            "render_quality": "fast",  # preview; exports re-render at "high"
             "title_font_size": 32,
             "capo_font_size": 14,
             "font_reg": self.font_reg,
@@ -229,6 +205,13 @@ class SongSheetApp(tk.Tk):
         self.load_media_files()
         self.after(500, self._start_web_server)
 
+        # --- Pick up songs and images changed outside the app (e.g. in the editor) ---
+        self.library_watcher = LibraryWatcher(
+            {song_dest: _is_song_file, image_dest: _is_image_file},
+            self._on_library_change,
+            post=lambda fn: self.after(0, fn),
+        ).start()
+
     def _create_controls_panel(self):
         controls_frame = ttk.Frame(self, padding="10")
         controls_frame.grid(row=0, column=0, sticky="nsew")
@@ -339,7 +322,7 @@ class SongSheetApp(tk.Tk):
 
         # --- Show Chords checkbox ---
         ttk.Checkbutton(
-            f, text="Show Chords", variable=self.params["show_chords"], command=self.update_image
+            f, text="Show Chords", variable=self.params["show_chords"], command=self._on_show_chords_toggle
         ).pack(pady=3)
 
         ttk.Separator(f, orient="horizontal").pack(fill="x", pady=(3, 4))
@@ -390,7 +373,7 @@ class SongSheetApp(tk.Tk):
         self.web_url_label.pack(fill="x", padx=5, pady=(0, 6))
 
     def _start_web_server(self):
-        """Start the Flask companion server in a background thread, then update the UI."""
+        """Start the web companion server in a background thread, then update the UI."""
         import threading
 
         def _run():
@@ -475,37 +458,90 @@ class SongSheetApp(tk.Tk):
         self.all_media_files = []
         try:
             self.all_media_files.extend(
-                sorted([f for f in os.listdir(song_dest) if f.endswith(".txt")])
+                sorted([f for f in os.listdir(song_dest) if _is_song_file(f)])
             )
         except FileNotFoundError:
             print("'txt_files' directory not found.")
         try:
             self.all_media_files.extend(
-                sorted(
-                    [
-                        f
-                        for f in os.listdir(image_dest)
-                        if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))
-                    ]
-                )
+                sorted([f for f in os.listdir(image_dest) if _is_image_file(f)])
             )
         except FileNotFoundError:
             print("'image_files' directory not found.")
         self.all_media_files.sort()
-        self._update_listbox(self.media_listbox, self.all_media_files)
+        self.library_index = LibraryIndex.build(self.all_media_files, song_dest)
+        self._apply_search()
+
+    def _on_library_change(self, changes):
+        """Apply files added, removed or edited outside the app (see LibraryWatcher).
+
+        Only the changed files are re-indexed and dropped from the caches.
+        """
+        reload_current = False
+        for change in changes:
+            for name in change.removed + change.modified:
+                self._forget_file(os.path.join(change.directory, name))
+            for name in change.removed:
+                self.library_index.remove(name)
+                idx = bisect.bisect_left(self.all_media_files, name)
+                if idx < len(self.all_media_files) and self.all_media_files[idx] == name:
+                    del self.all_media_files[idx]
+            for name in change.added + change.modified:
+                path = os.path.join(change.directory, name)
+                song = None
+                if change.directory == song_dest:
+                    try:
+                        song = load_song(path)
+                    except (OSError, UnicodeDecodeError) as e:
+                        print(f"Could not read {name}: {e}")
+                self.library_index.add(name, song)
+                idx = bisect.bisect_left(self.all_media_files, name)
+                if idx == len(self.all_media_files) or self.all_media_files[idx] != name:
+                    self.all_media_files.insert(idx, name)
+                if path == self.current_file_path and name in change.modified:
+                    reload_current = True
+        self._apply_search()
+
+        if reload_current and self.current_mode == "song":
+            try:
+                self._parse_song_file(self.current_file_path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error reloading {self.current_file_path}: {e}")
+                return
+            self.update_image()
+
+    def _forget_file(self, path):
+        """Drop the cached parse and renders of one library file."""
+        invalidate_song(path)
+        self.image_proxies.invalidate(path)
+        self.render_cache.invalidate(path)
+        self.prefetch_cache.invalidate(path)
 
     def _update_listbox(self, listbox, file_list):
-        listbox.delete(0, tk.END)
-        for item in file_list:
-            listbox.insert(tk.END, item)
+        """Show file_list in listbox, replacing only the rows that changed.
+
+        Rows are deleted and inserted with one Tk call each, so the cost does
+        not grow with the number of unchanged rows around the edit.
+        """
+        start, old_stop, new_stop = _changed_range(listbox.get(0, tk.END), file_list)
+        if old_stop > start:
+            listbox.delete(start, old_stop - 1)
+        if new_stop > start:
+            listbox.insert(start, *file_list[start:new_stop])
 
     def _on_search(self, *args):
-        search_term = self.search_var.get().lower()
-        if not search_term:
-            self._update_listbox(self.media_listbox, self.all_media_files)
-        else:
-            filtered = [f for f in self.all_media_files if search_term in f.lower()]
-            self._update_listbox(self.media_listbox, filtered)
+        # Search once typing pauses rather than on every keystroke
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def _apply_search(self):
+        self._search_after_id = None
+        query = self.search_var.get()
+        # Matches titles, first lines, section names and lyrics, best match first;
+        # with no query the list stays in sorted order, whatever the index order
+        results = self.library_index.search(query) if normalize(query) else self.all_media_files
+        self._update_listbox(self.media_listbox, results)
 
     def _add_to_session(self):
         selection_indices = self.media_listbox.curselection()
@@ -540,6 +576,97 @@ class SongSheetApp(tk.Tk):
     def on_session_item_select(self, event):
         self._clear_other_selections(self.session_listbox)
         self._process_selection(self.session_listbox)
+        self._prefetch_session_neighbours()
+
+    def _on_show_chords_toggle(self):
+        self.update_image()
+        self._prefetch_session_neighbours()
+
+    def _prefetch_session_neighbours(self):
+        """Queue background renders of the session items around the selection.
+
+        Each song is rendered the way selecting it will show it (its own capo, scale
+        reset to 0) with the current theme and chord visibility, so moving to the
+        next item is a cache hit. Images get their screen-sized proxies loaded.
+        """
+        selection_indices = self.session_listbox.curselection()
+        if not selection_indices:
+            return
+        idx = selection_indices[0]
+        items = self.session_listbox.get(0, tk.END)
+        neighbours = list(range(idx + 1, idx + 1 + self.prefetch_ahead))
+        neighbours += list(range(idx - 1, idx - 1 - self.prefetch_behind, -1))
+
+        base_params = self._get_render_params(scale_steps=0)
+        original_capo = self.original_capo
+        wanted = set()
+        for priority, i in enumerate(neighbours, start=1):
+            if not 0 <= i < len(items):
+                continue
+            folder = song_dest if items[i].lower().endswith(".txt") else image_dest
+            file_path = os.path.join(folder, items[i])
+            key = ("prefetch", file_path)
+            wanted.add(key)
+            self.render_scheduler.submit(
+                key,
+                lambda fp=file_path: self._prefetch_item(fp, base_params, original_capo),
+                priority=priority,
+            )
+        for key in self._prefetch_keys - wanted:
+            self.render_scheduler.cancel(key)
+        self._prefetch_keys = wanted
+
+    def _prefetch_item(self, file_path, base_params, original_capo):
+        """Worker-thread job: render one song into the prefetch cache, or load an image's proxies."""
+        if not file_path.lower().endswith(".txt"):
+            self._load_image_proxies(file_path)
+            return
+        song = load_song(file_path)
+        params = dict(base_params)
+        if song.capo is not None:
+            # Selecting the song will load its capo and compensate for it
+            params["capo"] = song.capo
+            original_capo = song.capo
+        params["transpose_steps"] = key_index(original_capo - params["capo"])
+        for variant in self._with_web_copy(params):
+            self._render_song(variant, file_path, song, cache=self.prefetch_cache)
+
+    @staticmethod
+    def _with_web_copy(params):
+        """The renders a slide needs: the projector one, plus a chords-on copy for the web."""
+        if params["show_chords"]:
+            return [params]
+        return [params, dict(params, show_chords=True)]
+
+    def _schedule_key_variants(self, gui_params):
+        """Queue builds of the current song in all 12 keys, nearest key first.
+
+        Rendered variants use the current capo, theme and chord visibility; a job
+        whose key is already built finishes straight away, so rescheduling on
+        every change is cheap.
+        """
+        variants = self.key_variants
+        if variants is None or variants.level == "off":
+            return
+
+        def render(params, song):
+            for variant in self._with_web_copy(params):
+                self._render_song(variant, variants.file_path, song, cache=variants.renders)
+
+        for rank, idx in enumerate(build_order(gui_params["transpose_steps"])):
+            params = dict(gui_params, transpose_steps=idx)
+            self.render_scheduler.submit(
+                ("key", variants.file_path, idx),
+                lambda p=params: variants.build(p["transpose_steps"], p, render),
+                priority=10 + rank,  # after the preview and the session look-ahead
+            )
+
+    def _release_key_variants(self):
+        """Drop the current song's key variants and any queued builds of them."""
+        variants, self.key_variants = self.key_variants, None
+        if variants is not None:
+            for idx in range(12):
+                self.render_scheduler.cancel(("key", variants.file_path, idx))
 
     def _clear_other_selections(self, current_listbox):
         if current_listbox != self.media_listbox:
@@ -565,14 +692,9 @@ class SongSheetApp(tk.Tk):
         else:
             self.current_mode = "image"
             self._toggle_controls("disabled")
+            self._release_key_variants()
             self.current_file_path = os.path.join(image_dest, selected_file)
-            try:
-                self.pil_image = Image.open(self.current_file_path)
-                self.update_image(is_static_image=True)
-            except Exception as e:
-                print(f"Error opening image {self.current_file_path}: {e}")
-                self.pil_image = None
-                self.image_canvas.delete("all")
+            self.update_image(is_static_image=True)
 
     def on_capo_change(self, direction):
         self.params["capo"].set(self.params["capo"].get() + direction)
@@ -583,52 +705,165 @@ class SongSheetApp(tk.Tk):
         self.update_image()
 
     def update_image(self, is_static_image=False):
-        gui_params = {}
-        song_data_for_render = []
         if is_static_image:
-            if not self.pil_image:
-                return
-            self.zoom_crop = None
-            self.is_zoomed = False
-        else:  # Is a song
-            if not self.current_song_data:
-                return
-            gui_params = {
-                key: var.get() if isinstance(var, (tk.IntVar, tk.BooleanVar)) else var
-                for key, var in self.params.items()
-            }
+            # Screen-sized proxies instead of the original, loaded on the worker thread
+            file_path = self.current_file_path
+            self.render_scheduler.submit(
+                "preview",
+                lambda: self._load_image_proxies(file_path),
+                lambda proxies: self._on_image_loaded(file_path, proxies),
+            )
+            return
 
-            # --- CHANGE 3: New logic for calculating transposition ---
-            scale_transposition = gui_params["scale_steps"]
-            capo_compensation = self.original_capo - gui_params["capo"]
-            gui_params["transpose_steps"] = scale_transposition + capo_compensation
+        if not self.current_song:
+            return
+        gui_params = self._get_render_params()
+        file_path, song = self.current_file_path, self.current_song
+        self._schedule_key_variants(gui_params)
+
+        # Already rendered (e.g. prefetched from the session): swap it in right away
+        image = self._cached_render(file_path, gui_params)
+        web_image = image
+        if image and not gui_params["show_chords"]:
+            web_image = self._cached_render(file_path, dict(gui_params, show_chords=True))
+        if image and web_image:
+            self.render_scheduler.cancel("preview")
+            self._on_song_rendered(file_path, image, web_image)
+            return
 
-            song_data_for_render = self._get_transposed_song_data(gui_params)
-            self.pil_image = create_arabic_song_image(song_data_for_render, gui_params)
-            if not self.pil_image:
-                return
-            # Re-apply existing zoom to the freshly rendered image
-            if self.is_zoomed and self.zoom_crop:
-                cx1, cy1, cx2, cy2 = self.zoom_crop
-                src_w, src_h = self.pil_image.size
-                cx1, cy1 = max(0, cx1), max(0, cy1)
-                cx2, cy2 = min(src_w, cx2), min(src_h, cy2)
-                self.pil_image_zoomed = self.pil_image.crop((cx1, cy1, cx2, cy2))
-            else:
-                self.is_zoomed = False
+        # Otherwise render on the worker thread; only the latest request is kept.
 
-        self._display_on_canvas(self.pil_image, self.image_canvas)
-        self._update_projector_view()
+        def render():
+            image = self._render_song(gui_params, file_path, song)
+            # Web app always shows chords for musicians, regardless of main display setting
+            web_image = image
+            if image and not gui_params["show_chords"]:
+                web_params = dict(gui_params, show_chords=True)
+                web_image = self._render_song(web_params, file_path, song)
+            return image, web_image
+
+        self.render_scheduler.submit(
+            "preview", render, lambda result: self._on_song_rendered(file_path, *result)
+        )
 
-        # Web app always shows chords for musicians, regardless of main display setting
-        if not is_static_image and not gui_params.get("show_chords", True):
-            web_params = dict(gui_params)
-            web_params["show_chords"] = True
-            web_image = create_arabic_song_image(song_data_for_render, web_params)
+    def _on_song_rendered(self, file_path, image, web_image):
+        """Runs on the Tk thread when a background song render finishes."""
+        if not image or self.current_mode != "song" or file_path != self.current_file_path:
+            return  # failed, or the user has moved on since the job was queued
+        self.pil_image = image
+        # Re-apply existing zoom to the freshly rendered image
+        if self.is_zoomed and self.zoom_crop:
+            cx1, cy1, cx2, cy2 = self.zoom_crop
+            src_w, src_h = self.pil_image.size
+            cx1, cy1 = max(0, cx1), max(0, cy1)
+            cx2, cy2 = min(src_w, cx2), min(src_h, cy2)
+            self.pil_image_zoomed = self.pil_image.crop((cx1, cy1, cx2, cy2))
         else:
-            web_image = self.pil_image
+            self.is_zoomed = False
+        self._show_current_image(web_image, slide_type="song")
+
+    def _load_image_proxies(self, file_path):
+        """Worker-thread job: (projector, preview, web) proxies of an image, or None.
+
+        The projector and preview proxies are decoded here; the web one stays a
+        LazyImage for web_server.push_image, which often needs only its file.
+        """
+        try:
+            proxies = self.image_proxies
+            projector = proxies.get(file_path, "projector").load()
+            preview = proxies.get(file_path, "preview")
+            preview.load()
+            return projector, preview, proxies.get(file_path, "web")
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            print(f"Error opening image {file_path}: {e}")
+            return None
+
+    def _on_image_loaded(self, file_path, proxies):
+        """Runs on the Tk thread when the proxies of a selected image are ready."""
+        if self.current_mode != "image" or file_path != self.current_file_path:
+            return  # the user has moved on since the job was queued
+        self.zoom_crop = None
+        self.is_zoomed = False
+        if proxies is None:
+            self.pil_image = None
+            self.image_canvas.delete("all")
+            return
+        self.pil_image, preview, web_image = proxies
+        self._show_current_image(web_image, slide_type="image", preview=preview)
+
+    def _show_current_image(self, web_image, slide_type, preview=None):
+        self._display_on_canvas(preview or self.pil_image, self.image_canvas)
+        self._update_projector_view()
         web_server.push_image(web_image, title=self.current_media_name or "",
-                              slide_type="image" if is_static_image else "song")
+                              slide_type=slide_type)
+
+    def _cached_render(self, file_path, gui_params):
+        """Return an in-memory render of file_path with gui_params, or None."""
+        key = render_key(file_path, gui_params)
+        return self._memory_cached(key, file_path) if key else None
+
+    def _memory_cached(self, key, file_path):
+        caches = [self.render_cache, self.prefetch_cache]
+        variants = self.key_variants
+        if variants is not None and variants.file_path == file_path:
+            caches.append(variants.renders)
+        for cache in caches:
+            img = cache.get(key)
+            if img is not None:
+                return img
+        return None
+
+    def _render_song(self, gui_params, file_path=None, song=None, cache=None):
+        """Render a song, reusing an identical earlier render when one is cached.
+
+        Looks in memory first, then in the on-disk cache, and only renders on a miss.
+        Defaults to the current song; pass file_path/song explicitly when
+        calling from the render worker. New renders are stored in `cache`
+        (the interactive render cache by default) and written to disk by a
+        later low-priority job, so the PNG encode never delays a preview.
+        """
+        file_path = file_path or self.current_file_path
+        cache = cache or self.render_cache
+        key = render_key(file_path, gui_params)
+        img = self._memory_cached(key, file_path) if key else None
+        if img is not None:
+            return img
+        disk_key = self.disk_render_cache.key_for_file(file_path, gui_params)
+        img = self.disk_render_cache.get(disk_key) if disk_key else None
+        if img is None:
+            song = self._transposed_song(gui_params["transpose_steps"], file_path, song)
+            img = create_arabic_song_image(song, gui_params)
+            if img and disk_key:
+                self.render_scheduler.submit(
+                    ("persist", disk_key),
+                    lambda: self.disk_render_cache.put(disk_key, img),
+                    priority=PERSIST_PRIORITY,
+                )
+        if img and key:
+            cache.put(key, img)
+        return img
+
+    def _transposed_song(self, transpose_steps, file_path, song=None):
+        """The song at file_path (default: the current one) in the requested key."""
+        variants = self.key_variants
+        if variants is not None and variants.file_path == file_path:
+            return variants.transposed(transpose_steps)
+        return (song or self.current_song).transposed(transpose_steps)
+
+    def _get_render_params(self, **overrides):
+        """Snapshot the current GUI parameters into a plain dict for the renderer."""
+        gui_params = {
+            key: var.get() if isinstance(var, (tk.IntVar, tk.BooleanVar)) else var
+            for key, var in self.params.items()
+        }
+
+        # --- CHANGE 3: New logic for calculating transposition ---
+        scale_transposition = gui_params["scale_steps"]
+        capo_compensation = self.original_capo - gui_params["capo"]
+        # Every Scale/Capo combination lands on one of the 12 key variants
+        gui_params["transpose_steps"] = key_index(scale_transposition + capo_compensation)
+        gui_params.update(overrides)
+        return gui_params
 
     def _display_on_canvas(self, pil_img, canvas_widget):
         self.after(50, lambda: self._display_on_canvas_after_delay(pil_img, canvas_widget))
@@ -641,7 +876,8 @@ class SongSheetApp(tk.Tk):
         if canvas_width < 2 or canvas_height < 2:
             return
 
-        img_copy = pil_img.copy()
+        # A LazyImage decodes at the smallest scale that still fills the canvas
+        img_copy = resolve(pil_img, (canvas_width, canvas_height)).copy()
         try:
             resample_filter = Image.Resampling.LANCZOS
         except AttributeError:
@@ -672,6 +908,7 @@ class SongSheetApp(tk.Tk):
         self._apply_ui_theme(theme)
         if self.pil_image:
             self.update_image(is_static_image=(self.current_mode == "image"))
+        self._prefetch_session_neighbours()
 
     def _apply_ui_theme(self, theme):
         style = ttk.Style()
@@ -759,50 +996,15 @@ class SongSheetApp(tk.Tk):
         if image_to_show:
             self._display_on_canvas(image_to_show, self.projector_label)
 
-    def _get_transposed_song_data(self, gui_params):
-        steps = gui_params["transpose_steps"]
-        song_data_for_render = []
-        for section in self.current_song_data:
-            if section["type"] != "lyrics_section":
-                song_data_for_render.append(section)
-            else:
-                new_section = {"type": "lyrics_section", "title": section["title"], "lines": []}
-                for line_info in section["lines"]:
-                    new_section["lines"].append(
-                        MusicTheory.transpose_line(line_info["line"], steps)
-                    )
-                song_data_for_render.append(new_section)
-        return song_data_for_render
-
     def _parse_song_file(self, file_path):
-        with open(file_path, encoding="utf-8") as f:
-            lines = f.readlines()
-        self.current_song_data = []
-        current_section: dict | None = None
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("Title:"):
-                self.current_song_data.append(
-                    {"type": "title", "content": line.replace("Title:", "").strip()}
-                )
-            elif line.startswith("Capo:"):
-                # --- CHANGE 2: Store the original capo from the file ---
-                try:
-                    capo_val = int(line.replace("Capo:", "").strip())
-                    self.params["capo"].set(capo_val)
-                    self.original_capo = capo_val
-                except ValueError:
-                    self.params["capo"].set(0)
-                    self.original_capo = 0
-                self.current_song_data.append({"type": "capo"})
-            elif re.fullmatch(r"\[.*?\]", line):
-                current_section = {"type": "lyrics_section", "title": line[1:-1], "lines": []}
-                self.current_song_data.append(current_section)
-            elif current_section is not None:
-                chords = re.findall(r"\[(.*?)\]", line)
-                current_section["lines"].append({"line": line, "chords": chords})
+        self.current_song = load_song(file_path)
+        self._release_key_variants()
+        if self.key_variants_level != "off":
+            self.key_variants = KeyVariants(file_path, self.current_song, self.key_variants_level)
+        if self.current_song.capo is not None:
+            # --- CHANGE 2: Store the original capo from the file ---
+            self.params["capo"].set(self.current_song.capo)
+            self.original_capo = self.current_song.capo
 
     def _import_files(self):
         title = "Import Media Files"
@@ -897,12 +1099,33 @@ class SongSheetApp(tk.Tk):
             defaultextension=".png",
             filetypes=[("PNG Image", "*.png"), ("All Files", "*.*")],
         )
-        if filepath:
-            try:
-                self.pil_image.save(filepath)
-                print(f"Image saved to: {filepath}")
-            except Exception as e:
-                print(f"Error saving image: {e}")
+        if not filepath:
+            return
+        # Decoding the original or a 4x supersampled render takes a while: do it on the worker
+        mode, file_path, song = self.current_mode, self.current_file_path, self.current_song
+        preview = self.pil_image
+        export_params = self._get_render_params(render_quality="high")
+
+        def render():
+            if mode == "image":
+                # The display uses a downscaled proxy; export the original
+                return decode_image(file_path)
+            if mode == "song" and song:
+                # The preview is rendered in fast mode; export at full quality
+                return self._render_song(export_params, file_path, song) or preview
+            return preview
+
+        self.render_scheduler.submit(
+            ("export", filepath), render, lambda image: self._save_export(image, filepath)
+        )
+
+    def _save_export(self, image, filepath):
+        """Runs on the Tk thread once the image chosen in export_image is ready."""
+        try:
+            image.save(filepath)
+            print(f"Image saved to: {filepath}")
+        except Exception as e:
+            print(f"Error saving image: {e}")
 
     def set_as_default(self):
         if not self.current_file_path:
@@ -930,6 +1153,8 @@ class SongSheetApp(tk.Tk):
                 f.writelines(new_lines)
             print(f"Successfully updated defaults for {os.path.basename(self.current_file_path)}")
 
+            self.render_cache.invalidate(self.current_file_path)
+            invalidate_song(self.current_file_path)
             self.params["scale_steps"].set(0)
             self._parse_song_file(self.current_file_path)
             self.update_image()
@@ -987,41 +1212,56 @@ class SongSheetApp(tk.Tk):
             return
 
         # Capture base params (fonts, colors, show_chords, etc.) — capo will be set per song
-        base_params = {
-            key: var.get() if isinstance(var, (tk.IntVar, tk.BooleanVar)) else var
-            for key, var in self.params.items()
-        }
-        base_params["scale_steps"] = 0
+        base_params = self._get_render_params(scale_steps=0, render_quality="high")
         base_params["transpose_steps"] = 0
 
-        success, errors = 0, []
-        for filename in txt_files:
-            try:
-                file_path = os.path.join(song_dest, filename)
-                self._parse_song_file(file_path)
-                # Build per-song params with this file's actual capo
-                song_params = dict(base_params)
-                song_params["capo"] = self.params["capo"].get()
-                # Convert raw song data (dicts) to render-ready strings via _get_transposed_song_data
-                song_data_for_render = self._get_transposed_song_data(song_params)
-                img = create_arabic_song_image(song_data_for_render, song_params)
-                if img:
-                    out_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".png")
-                    img.save(out_path)
-                    success += 1
-            except Exception as e:
-                errors.append(f"{filename}: {e}")
-
-        msg = f"Exported {success} of {len(txt_files)} songs to:\n{output_dir}"
-        if errors:
-            msg += f"\n\nFailed ({len(errors)}):\n" + "\n".join(errors)
-        messagebox.showinfo("Export All Songs", msg)
+        job = ExportJob(
+            [os.path.join(song_dest, f) for f in txt_files],
+            output_dir,
+            base_params,
+            cache_dir=render_cache_dir,
+        ).start()
+        self._show_export_progress(job)
+
+    def _show_export_progress(self, job):
+        """Progress window for a running ExportJob, polled from the Tk event loop."""
+        win = tk.Toplevel(self)
+        win.title("Export All Songs")
+        win.resizable(False, False)
+        win.transient(self)
+        frame = ttk.Frame(win, padding=12)
+        frame.pack(fill="both", expand=True)
+        status = ttk.Label(frame, text=f"Exporting {len(job.song_files)} songs…", width=40)
+        status.pack(fill="x")
+        bar = ttk.Progressbar(frame, length=300, maximum=len(job.song_files))
+        bar.pack(fill="x", pady=8)
+        cancel_button = ttk.Button(frame, text="Cancel", command=job.cancel)
+        cancel_button.pack()
+        win.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        def poll():
+            finished, total = job.progress()
+            bar["value"] = finished
+            status.config(text=f"Exported {finished} of {total}…" if not job.cancelled else "Cancelling…")
+            if not job.done:
+                self.after(100, poll)
+                return
+            job.close()
+            win.destroy()
+            msg = f"Exported {len(job.exported)} of {total} songs to:\n{job.output_dir}"
+            if job.skipped:
+                msg += f"\n\n{len(job.skipped)} unchanged song(s) were skipped."
+            if job.removed:
+                msg += f"\nRemoved {len(job.removed)} image(s) of deleted songs."
+            if job.cancelled:
+                msg = "Export cancelled.\n\n" + msg
+            if job.errors:
+                msg += f"\n\nFailed ({len(job.errors)}):\n" + "\n".join(
+                    f"{name}: {error}" for name, error in job.errors
+                )
+            messagebox.showinfo("Export All Songs", msg)
 
-        # Restore the previously selected song state
-        if self.current_file_path:
-            self._parse_song_file(self.current_file_path)
-            self.params["scale_steps"].set(0)
-            self.update_image()
+        poll()
 
     def open_projector_window(self):
         if self.projector_window and self.projector_window.winfo_exists():
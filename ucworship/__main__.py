@@ -1,5 +1,8 @@
+import multiprocessing
+
 from ucworship.ImageCreationGUI import SongSheetApp
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Export All worker processes in the frozen app
     app = SongSheetApp()
     app.mainloop()
@@ -0,0 +1,238 @@
+"""
+Asyncio companion server.
+
+Serves the web companion routes of web_server (/, /image, /slide/... and
+/stream) from a single event loop thread, using only the standard library.
+SSE clients are plain sockets held by the loop rather than threads: each
+frame published by web_server's encoder is handed to the loop once and
+written to every client from there, so hundreds of phones cost one thread
+and a few kilobytes each.
+"""
+
+import asyncio
+import contextlib
+import http
+import os
+import sys
+import threading
+
+from ucworship import web_server
+
+_here = getattr(sys, "_MEIPASS", os.path.dirname(__file__))
+_page = (
+    os.path.join(_here, "ucworship", "templates", "musician.html")
+    if getattr(sys, "frozen", False)
+    else os.path.join(os.path.dirname(__file__), "templates", "musician.html")
+)
+
+HEARTBEAT_S = 25
+_HEARTBEAT = b": heartbeat\n\n"
+KEEP_ALIVE_S = 30  # idle time before a non-stream connection is closed
+MAX_HEADER_LINES = 100
+
+
+class _LoopSink:
+    """web_server subscriber that forwards frames into the event loop (see add_subscriber)."""
+
+    def __init__(self, loop, broadcast):
+        self._loop = loop
+        self._broadcast = broadcast
+
+    def put_nowait(self, frame):
+        self._loop.call_soon_threadsafe(self._broadcast, frame)
+
+
+class AsyncWebServer:
+    """The companion server on one asyncio loop in a daemon thread.
+
+    A stream client whose unsent data exceeds max_buffered bytes (a phone
+    that stopped reading) is disconnected, so memory stays bounded; the page
+    reconnects by itself and gets the current slide.
+    """
+
+    def __init__(self, host="0.0.0.0", port=5050, max_buffered=1024 * 1024):
+        self.host = host
+        self.port = port  # the bound port once started (port 0 picks a free one)
+        self.max_buffered = max_buffered
+        self.dropped = 0  # stream clients disconnected for not keeping up
+        self._clients = set()  # StreamWriters of connected /stream clients
+        self._handlers = set()  # connection tasks, cancelled on shutdown
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        with open(_page, "rb") as f:
+            self._page = f.read()
+
+    def start(self):
+        """Bind and serve in the background; raises OSError if the port cannot be bound."""
+        self._thread = threading.Thread(target=self._run, name="web-async-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def shutdown(self):
+        if self._loop is not None and not self._loop.is_closed():
+            with contextlib.suppress(RuntimeError):  # loop already finished
+                self._loop.call_soon_threadsafe(self._stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return {"clients": len(self._clients), "dropped": self.dropped}
+
+    def _stop(self):
+        if not self._stopped.done():
+            self._stopped.set_result(None)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except OSError as e:
+            self._error = e
+        finally:
+            self._ready.set()
+            self._loop.close()
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self._stopped = loop.create_future()
+        server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        sink = _LoopSink(loop, self._broadcast)
+        web_server.add_subscriber(sink)
+        heartbeat = loop.create_task(self._heartbeat())
+        self._ready.set()
+        try:
+            await self._stopped
+        finally:
+            web_server.remove_subscriber(sink)
+            heartbeat.cancel()
+            server.close()
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await server.wait_closed()
+
+    # --- Stream fan-out (runs on the loop) ---
+    def _broadcast(self, frame):
+        """Write one frame to every stream client; the same bytes object for all of them."""
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > self.max_buffered:
+                self._clients.discard(writer)
+                self.dropped += 1
+                writer.close()
+            else:
+                writer.write(frame)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_S)
+            self._broadcast(_HEARTBEAT)
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEP_ALIVE_S)
+                except (TimeoutError, ValueError, asyncio.LimitOverrunError):
+                    break
+                if request is None:
+                    break
+                method, path, headers = request
+                if path == "/stream" and method == "GET":
+                    await self._stream(reader, writer)
+                    break
+                keep_alive = await self._respond(writer, method, path, headers)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, OSError):
+            pass
+        except asyncio.CancelledError:
+            pass  # shutdown; finishing normally keeps asyncio from logging the cancellation
+        finally:
+            self._handlers.discard(task)
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer, method, path, headers):
+        """Write the response to one plain request; returns whether to keep the connection."""
+        if method not in ("GET", "HEAD"):
+            status, extra, body = 405, {"Allow": "GET, HEAD"}, b""
+        elif path == "/":
+            status, extra, body = 200, {"Content-Type": "text/html; charset=utf-8"}, self._page
+        elif path == "/image":
+            body = web_server.current_image()
+            if body:
+                status, extra = 200, {"Content-Type": "image/jpeg", "Cache-Control": "no-store"}
+            else:
+                status, extra, body = 204, {}, b""
+        elif path.startswith("/slide/"):
+            # May encode a variant: keep it off the loop
+            matches = _etag_matcher(headers.get("if-none-match", ""))
+            status, extra, body = await asyncio.get_running_loop().run_in_executor(
+                None, web_server.slide_response, path[len("/slide/") :], matches
+            )
+        else:
+            status, extra, body = 404, {}, b""
+        keep_alive = headers.get("connection", "").lower() != "close"
+        head = _status_line(status, extra, len(body), keep_alive)
+        writer.write(head)
+        if body and method != "HEAD" and status != 304:
+            writer.write(body)
+        return keep_alive
+
+    async def _stream(self, reader, writer):
+        headers = {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+        writer.write(_status_line(200, headers, None, keep_alive=False))
+        writer.write(web_server.current_frame())
+        self._clients.add(writer)
+        # Nothing more comes from an SSE client; reading only notices when it goes away
+        while await reader.read(1024):
+            pass
+
+
+async def _read_request(reader):
+    """(method, path, headers) of the next request, or None at end of stream."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ValueError("too many header lines")
+    return method, target.split("?", 1)[0], headers
+
+
+def _status_line(status, headers, length, keep_alive):
+    """Status line and headers; length None leaves the body open until the connection closes."""
+    lines = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _etag_matcher(if_none_match):
+    """etag_matches() for web_server.slide_response from an If-None-Match header value."""
+    tags = {tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")}
+    return lambda etag: "*" in tags or etag in tags
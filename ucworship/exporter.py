@@ -0,0 +1,245 @@
+"""
+Export All: render every song in the library to PNG using a process pool.
+
+Each song is parsed and rendered in a worker process, so the export scales
+across cores and never touches the GUI's current song state. The GUI polls
+ExportJob.progress() from the Tk event loop and can cancel() at any time.
+
+Exports are incremental: a manifest in the output folder records what each
+PNG was rendered from, so re-exporting only renders songs whose text, render
+params or fonts changed, and removes PNGs whose song was deleted.
+"""
+
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from ucworship.image_automation_script import create_arabic_song_image
+from ucworship.render_cache import RENDER_KEY_PARAMS, DiskRenderCache, font_fingerprints
+from ucworship.songs import load_song
+
+MANIFEST_NAME = ".ucworship-export.json"
+MANIFEST_VERSION = 1
+
+
+# Params export_song sets per song, so the GUI's current values never matter
+_PER_SONG_PARAMS = ("capo", "transpose_steps")
+
+
+def export_params(song, base_params):
+    """The params a song is exported with: as written, with the file's capo and no transposition.
+
+    A song without a "Capo:" line draws no capo, so its capo is simply 0.
+    """
+    return dict(base_params, capo=song.capo or 0, transpose_steps=0)
+
+
+def export_song(file_path, out_path, base_params, cache_dir=None):
+    """Render one song file to out_path with export_params(). Runs in a worker process.
+
+    Raises on failure.
+    """
+    song = load_song(file_path)
+    params = export_params(song, base_params)
+
+    disk_cache = DiskRenderCache(cache_dir) if cache_dir else None
+    disk_key = disk_cache.key_for_file(file_path, params) if disk_cache else None
+    if disk_key:
+        cached_path = disk_cache.path_for(disk_key)
+        if os.path.exists(cached_path):
+            # Rendered before with the same text, params and fonts
+            shutil.copyfile(cached_path, out_path)
+            os.utime(cached_path)
+            return out_path
+
+    img = create_arabic_song_image(song, params)
+    if img is None:
+        raise OSError("could not load fonts")
+    img.save(out_path)
+    if disk_key:
+        disk_cache.put(disk_key, img)
+    return out_path
+
+
+def export_fingerprint(file_path, base_params, fonts):
+    """What an exported PNG depends on: the song text, render params and font files.
+
+    The per-song capo and transposition come from the song text (see
+    export_params), so they are covered by the source hash rather than taken
+    from base_params.
+    """
+    with open(file_path, "rb") as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "source": os.path.basename(file_path),
+        "source_sha256": source_hash,
+        "params": {
+            name: base_params.get(name)
+            for name in RENDER_KEY_PARAMS
+            if name not in _PER_SONG_PARAMS
+        },
+        "fonts": fonts,
+    }
+
+
+def _canonical(fingerprint):
+    return json.dumps(fingerprint, sort_keys=True, ensure_ascii=False)
+
+
+def load_manifest(output_dir):
+    """Return {output filename: fingerprint} from a previous export, or {}."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("outputs", {})
+
+
+def save_manifest(output_dir, outputs):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "outputs": outputs}, f, ensure_ascii=False, indent=1
+            )
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write export manifest: {e}")
+
+
+class ExportJob:
+    """A running Export All: one process-pool task per changed song file.
+
+    Songs whose output is up to date according to the manifest are counted
+    as `skipped`; outputs whose source song no longer exists are deleted and
+    listed in `removed`.
+    """
+
+    def __init__(self, song_files, output_dir, base_params, cache_dir=None, max_workers=None):
+        self.song_files = list(song_files)
+        self.output_dir = output_dir
+        self.base_params = dict(base_params)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.exported = []
+        self.skipped = []
+        self.removed = []
+        self.errors = []  # (filename, message)
+        self.cancelled = False
+        self._manifest = {}
+        self._finished = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futures = []
+
+    def start(self):
+        self._manifest = load_manifest(self.output_dir)
+        self._remove_orphans()
+
+        fonts = font_fingerprints(self.base_params)
+        todo = []
+        for file_path in self.song_files:
+            filename = os.path.basename(file_path)
+            out_name = os.path.splitext(filename)[0] + ".png"
+            try:
+                fingerprint = export_fingerprint(file_path, self.base_params, fonts)
+            except OSError as e:
+                self._finish(filename, error=str(e))
+                continue
+            previous = self._manifest.get(out_name)
+            if (
+                previous is not None
+                and _canonical(previous) == _canonical(fingerprint)
+                and os.path.exists(os.path.join(self.output_dir, out_name))
+            ):
+                self._finish(filename, skipped=out_name)
+            else:
+                todo.append((file_path, out_name, fingerprint))
+
+        if not todo:
+            save_manifest(self.output_dir, self._manifest)
+            return self
+
+        # Spawn, not fork: a worker forked while one of the GUI's threads holds a
+        # lock (song cache, font registry) would deadlock on its first render
+        self._executor = ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(todo)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        for file_path, out_name, fingerprint in todo:
+            future = self._executor.submit(
+                export_song,
+                file_path,
+                os.path.join(self.output_dir, out_name),
+                self.base_params,
+                self.cache_dir,
+            )
+            future.add_done_callback(
+                lambda f, name=out_name, fp=fingerprint: self._on_done(name, fp, f)
+            )
+            self._futures.append(future)
+        return self
+
+    def _remove_orphans(self):
+        """Delete outputs recorded in the manifest whose source song is gone."""
+        sources = {os.path.basename(p) for p in self.song_files}
+        for out_name, fingerprint in list(self._manifest.items()):
+            if fingerprint.get("source") in sources:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.output_dir, out_name))
+            del self._manifest[out_name]
+            self.removed.append(out_name)
+
+    def _on_done(self, out_name, fingerprint, future):
+        try:
+            out_path = future.result()
+        except CancelledError:
+            self._finish(fingerprint["source"])
+        except Exception as e:
+            self._finish(fingerprint["source"], error=str(e) or type(e).__name__)
+        else:
+            with self._lock:
+                self._manifest[out_name] = fingerprint
+            self._finish(fingerprint["source"], exported=out_path)
+
+    def _finish(self, filename, exported=None, skipped=None, error=None):
+        with self._lock:
+            self._finished += 1
+            if exported:
+                self.exported.append(exported)
+            if skipped:
+                self.skipped.append(skipped)
+            if error:
+                self.errors.append((filename, error))
+            if self._finished == len(self.song_files) and self._futures:
+                save_manifest(self.output_dir, self._manifest)
+
+    def progress(self):
+        """Return (finished, total); finished counts successes, failures and cancellations."""
+        with self._lock:
+            return self._finished, len(self.song_files)
+
+    @property
+    def done(self):
+        finished, total = self.progress()
+        return finished >= total
+
+    def cancel(self):
+        """Stop queued songs; songs already rendering are allowed to finish."""
+        self.cancelled = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -1,464 +1,471 @@
-import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
 
 import arabic_reshaper
 from bidi.algorithm import get_display
 from PIL import Image, ImageDraw, ImageFont
 
 
-def _is_arabic_text(text):
-    return any("\u0600" <= ch <= "\u06FF" for ch in text)
+class FontRegistry:
+    """Process-wide LRU cache of loaded FreeType fonts, keyed by (path, size).
 
+    Parsing a TTF is the most expensive part of setting up a render, and every
+    capo/scale click, theme toggle and Export All song asks for the same handful
+    of (path, size) pairs. Fonts that fail to load are not cached.
+    """
 
-def _detect_language(song_data):
-    for section in song_data:
-        if section["type"] == "lyrics_section":
-            for line in section["lines"]:
-                clean = re.sub(r"\[.*?\]", "", line)
-                if _is_arabic_text(clean):
-                    return "arabic"
-    return "english"
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, size):
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+        font = ImageFont.truetype(path, size)  # raises OSError for a bad path
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.maxsize:
+                self._fonts.popitem(last=False)
+        return font
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._fonts),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_font_registry = FontRegistry()
+
+
+def get_font(path, size):
+    """Return a cached ImageFont for (path, size), loading it from disk on first use."""
+    return _font_registry.get(path, size)
+
+
+def font_cache_stats():
+    """Hit/miss counters of the shared font registry, e.g. {'hits': 40, 'misses': 5, ...}."""
+    return _font_registry.stats()
 
 
-def create_english_song_image(song_data, params):
-    """Generates a left-to-right song sheet image for English songs."""
-    scale_factor = 4
-    lyric_font_size = params["lyric_font_size"]
-    chord_font_size = params["chord_font_size"]
-    title_font_size = params["title_font_size"]
-    capo_font_size = params["capo_font_size"]
-    show_chords = params["show_chords"]
-    english_font_path = params["font_english"]
-    english_bold_font_path = params["font_english_bold"]
-    chord_font_path = params["font_chord"]
+def _is_arabic_text(text):
+    return any("\u0600" <= ch <= "\u06ff" for ch in text)
 
-    image_width = 1850
-    padding = 70
-    line_spacing = 18
-    section_spacing = 70
 
-    image_width_scaled = image_width * scale_factor
-    padding_scaled = padding * scale_factor
-    line_spacing_scaled = line_spacing * scale_factor
-    section_spacing_scaled = section_spacing * scale_factor
+def _detect_language(song):
+    for line in song.lines():
+        if _is_arabic_text(line.lyrics):
+            return "arabic"
+    return "english"
 
-    background_color = params.get("bg_color", (255, 255, 255))
-    text_color = params.get("text_color", (0, 0, 0))
-    chord_color = params.get("chord_color", (180, 180, 180))
 
-    try:
-        title_font = ImageFont.truetype(english_bold_font_path, title_font_size * scale_factor)
-        lyric_font = ImageFont.truetype(english_font_path, lyric_font_size * scale_factor)
-        bold_lyric_font = ImageFont.truetype(english_bold_font_path, lyric_font_size * scale_factor)
-        chord_font = ImageFont.truetype(chord_font_path, chord_font_size * scale_factor)
-        capo_font = ImageFont.truetype(english_font_path, capo_font_size * scale_factor)
-    except OSError as e:
-        print(f"Error loading font: {e}. Aborting.")
-        return None
+# --- Layout pass ---
+# A layout is everything about a song sheet that depends on the text, fonts and
+# sizes: where every string goes and how big the canvas is. It is independent of
+# the colour theme and of chord visibility, so toggling those only repaints.
+# Positions are measured first, so the painter allocates a canvas of exactly the
+# song's size instead of a fixed scratch image that is cropped afterwards.
+IMAGE_WIDTH = 1850
+PADDING = 70
+LINE_SPACING = 18
+SECTION_SPACING = 70
+
+# Supersampling factor for each render quality. "fast" draws at native size and
+# relies on FreeType's own antialiasing; the others draw at 2x/4x and downsample
+# with LANCZOS, which is noticeably slower but smoother on thin Arabic strokes.
+RENDER_QUALITY = {"fast": 1, "balanced": 2, "high": 4}
+DEFAULT_RENDER_QUALITY = "high"
+
+
+class LayoutItem(NamedTuple):
+    kind: str  # "text" | "chord"
+    x: float
+    y: float
+    text: str
+    font: tuple  # (path, size) for get_font
+    anchor: str
+
+
+class SongLayout(NamedTuple):
+    scale_factor: int
+    canvas_size: tuple  # supersampled canvas (w, h), exactly the song's extent
+    size: tuple  # final (w, h) of the painted image
+    items: tuple  # LayoutItem, in paint order
+
+
+class LayoutSpec(NamedTuple):
+    """Hashable subset of the GUI params that affects layout (not colours or chord visibility)."""
+
+    language: str
+    scale_factor: int
+    capo: int
+    font_reg: str
+    font_bold: str
+    font_chord: str
+    lyric_font_size: int
+    chord_font_size: int
+    title_font_size: int
+    capo_font_size: int
+
+
+def _layout_spec(song, params, language=None):
+    """LayoutSpec of song with params; `language` forces one instead of detecting it."""
+    language = language or _detect_language(song)
+    scale_factor = RENDER_QUALITY[params.get("render_quality", DEFAULT_RENDER_QUALITY)]
+    if language == "english":
+        font_reg, font_bold = params["font_english"], params["font_english_bold"]
+    else:
+        font_reg, font_bold = params["font_reg"], params["font_bold"]
+    return LayoutSpec(
+        language=language,
+        scale_factor=scale_factor,
+        capo=params["capo"],
+        font_reg=font_reg,
+        font_bold=font_bold,
+        font_chord=params["font_chord"],
+        lyric_font_size=params["lyric_font_size"],
+        chord_font_size=params["chord_font_size"],
+        title_font_size=params["title_font_size"],
+        capo_font_size=params["capo_font_size"],
+    )
 
-    temp_height = 4000 * scale_factor
-    img = Image.new("RGB", (image_width_scaled, temp_height), color=background_color)
-    draw = ImageDraw.Draw(img)
+
+@lru_cache(maxsize=4096)
+def _ligature_offset(segment):
+    """Characters of `segment` that collapse into a ligature once reshaped.
+
+    Each lam-alef pair renders as one glyph and "الله" as a single glyph, so the
+    shaped line is shorter than the raw text by this many characters.
+    """
+    index = 0
+    lam_alef = 0
+    while index < len(segment):
+        if index + 1 < len(segment) and segment[index] == "ل" and segment[index + 1] in "اأ":
+            lam_alef += 1
+            index += 2
+        else:
+            index += 1
+
+    index = 0
+    allah = 0
+    while index < len(segment):
+        if segment[index : index + 4] == "الله":
+            allah += 3
+            index += 4
+        else:
+            index += 1
+    return lam_alef + allah
+
+
+@lru_cache(maxsize=2048)
+def _shape_text(text):
+    """Reshape Arabic text and reorder it for display (visual, left-to-right order)."""
+    return get_display(arabic_reshaper.reshape(text))
+
+
+class ShapedLine(NamedTuple):
+    display: str  # reshaped, bidi-reordered clean line
+    slices: tuple  # (start, stop) into display for each lyric segment, in logical order
+
+
+@lru_cache(maxsize=2048)
+def _shape_line(skeleton):
+    """Shape a lyric line once and locate each lyric segment in the shaped text.
+
+    Lyrics do not change under transposition and shaping does not depend on the
+    font, so capo/scale clicks, font-size changes and the bold chorus variant
+    all reuse the same entry.
+    """
+    display = _shape_text("".join(s for s in skeleton if s is not None))
+    slices = []
+    cursor = len(display)
+    for segment in skeleton:
+        if segment is None:
+            continue
+        visible_len = len(segment) - _ligature_offset(segment)
+        slices.append((cursor - visible_len, cursor))
+        cursor -= visible_len
+    return ShapedLine(display, tuple(slices))
+
+
+@lru_cache(maxsize=4096)
+def _layout_english_line(skeleton, font_path, font_size):
+    """Return (clean_line, width, chord_offsets) with offsets measured from the line start."""
+    font = get_font(font_path, font_size)
+    clean_line = "".join(s for s in skeleton if s is not None)
+    offsets = []
+    x_cursor = 0.0
+    for segment in skeleton:
+        if segment is None:
+            offsets.append(x_cursor)
+        else:
+            x_cursor += font.getlength(segment)
+    return clean_line, font.getlength(clean_line), tuple(offsets)
+
+
+@lru_cache(maxsize=4096)
+def _layout_arabic_line(skeleton, font_path, font_size):
+    """Return (bidi_line, width, chord_offsets) with offsets measured leftwards from the right edge."""
+    font = get_font(font_path, font_size)
+    shaped = _shape_line(skeleton)
+    offsets = []
+    consumed = 0.0
+    slices = iter(shaped.slices)
+    for segment in skeleton:
+        if segment is None:
+            offsets.append(consumed)
+        else:
+            start, stop = next(slices)
+            consumed += font.getlength(shaped.display[start:stop])
+    return shaped.display, font.getlength(shaped.display), tuple(offsets)
+
+
+def _layout_english(song_key, spec):
+    sf = spec.scale_factor
+    image_width_scaled = IMAGE_WIDTH * sf
+    padding_scaled = PADDING * sf
+    line_spacing_scaled = LINE_SPACING * sf
+    section_spacing_scaled = SECTION_SPACING * sf
+
+    title_spec = (spec.font_bold, spec.title_font_size * sf)
+    lyric_spec = (spec.font_reg, spec.lyric_font_size * sf)
+    bold_lyric_spec = (spec.font_bold, spec.lyric_font_size * sf)
+    chord_spec = (spec.font_chord, spec.chord_font_size * sf)
+    capo_spec = (spec.font_reg, spec.capo_font_size * sf)
+    title_font = get_font(*title_spec)
+    chord_font = get_font(*chord_spec)
+    capo_font = get_font(*capo_spec)
+    chord_height = chord_font.getbbox("Cm")[3]
+    min_gap = spec.chord_font_size * sf * 0.3
+
+    items = []
     center_x = image_width_scaled / 2
     y_position = padding_scaled / 3
 
-    for section in song_data:
-        sec_type = section["type"]
-
+    for sec_type, text, lines in song_key:
         if sec_type == "title":
-            text = section["content"]
-            draw.text((center_x, y_position), text, font=title_font, fill=text_color, anchor="mt")
+            items.append(LayoutItem("text", center_x, y_position, text, title_spec, "mt"))
             y_position += title_font.getbbox(text)[3] + line_spacing_scaled
 
         elif sec_type == "capo":
-            capo_text = f"Capo: {params['capo']}"
-            draw.text(
-                (center_x, y_position), capo_text, font=capo_font, fill=text_color, anchor="mt"
-            )
+            capo_text = f"Capo: {spec.capo}"
+            items.append(LayoutItem("text", center_x, y_position, capo_text, capo_spec, "mt"))
             y_position += capo_font.getbbox(capo_text)[3]
 
         elif sec_type == "lyrics_section":
-            is_chorus = "chorus" in section["title"].lower()
-            current_lyric_font = bold_lyric_font if is_chorus else lyric_font
-
-            for line in section["lines"]:
-                clean_line = re.sub(r"\[.*?\]", "", line)
-                segments = [s for s in re.split(r"(\[.*?\])", line) if s]
+            line_spec = bold_lyric_spec if "chorus" in text.lower() else lyric_spec
+            line_height = get_font(*line_spec).getbbox("Sample")[3]
 
-                total_lyric_width = draw.textlength(clean_line, font=current_lyric_font)
+            for skeleton, chords in lines:
+                clean_line, total_lyric_width, offsets = _layout_english_line(skeleton, *line_spec)
                 text_start_x = center_x - total_lyric_width / 2
-
                 chord_y = y_position
-                lyric_y = y_position + chord_font.getbbox("Cm")[3]
-
-                draw.text(
-                    (text_start_x, lyric_y),
-                    clean_line,
-                    font=current_lyric_font,
-                    fill=text_color,
-                    anchor="la",
-                )
-
-                if show_chords:
-                    x_cursor = text_start_x
-                    last_chord_end_x = -1
-
-                    for segment in segments:
-                        if not re.fullmatch(r"\[.*?\]", segment):
-                            x_cursor += draw.textlength(segment, font=current_lyric_font)
-                        else:
-                            chord_text = segment[1:-1]
-                            chord_width = draw.textlength(chord_text, font=chord_font)
-                            chord_x = x_cursor
-                            # Push right if overlapping with previous chord
-                            min_gap = chord_font_size * scale_factor * 0.3
-                            if chord_x < last_chord_end_x + min_gap:
-                                chord_x = last_chord_end_x + min_gap
-                            draw.text(
-                                (chord_x, chord_y),
-                                chord_text,
-                                font=chord_font,
-                                fill=chord_color,
-                                anchor="lt",
-                            )
-                            last_chord_end_x = chord_x + chord_width
-
-                y_position += (
-                    current_lyric_font.getbbox("Sample")[3]
-                    + chord_font.getbbox("Cm")[3]
-                    + line_spacing_scaled
-                )
+                lyric_y = y_position + chord_height
+                items.append(LayoutItem("text", text_start_x, lyric_y, clean_line, line_spec, "la"))
+
+                last_chord_end_x = -1
+                for chord_text, offset in zip(chords, offsets, strict=True):
+                    chord_x = text_start_x + offset
+                    # Push right if overlapping with previous chord
+                    if chord_x < last_chord_end_x + min_gap:
+                        chord_x = last_chord_end_x + min_gap
+                    items.append(
+                        LayoutItem("chord", chord_x, chord_y, chord_text, chord_spec, "lt")
+                    )
+                    last_chord_end_x = chord_x + chord_font.getlength(chord_text)
+
+                y_position += line_height + chord_height + line_spacing_scaled
             y_position += section_spacing_scaled
 
-    final_height_px = int(y_position + padding_scaled)
-    final_image_scaled = img.crop((0, 0, image_width_scaled, final_height_px))
-    final_w = int(final_image_scaled.width / scale_factor)
-    final_h = int(final_image_scaled.height / scale_factor)
-
-    try:
-        resample_filter = Image.Resampling.LANCZOS
-    except AttributeError:
-        resample_filter = Image.LANCZOS
-
-    return final_image_scaled.resize((final_w, final_h), resample_filter)
-
-
-def create_arabic_song_image(song_data, params):
-    """
-    Generates a song sheet image from pre-parsed song data and GUI parameters.
-    Automatically routes to English (LTR) or Arabic (RTL) rendering based on content.
-    """
-    if _detect_language(song_data) == "english":
-        return create_english_song_image(song_data, params)
-
-    debug = 0
-
-    # --- 1. Unpack GUI Parameters ---
-    scale_factor = 4
-    lyric_font_size = params["lyric_font_size"]
-    chord_font_size = params["chord_font_size"]
-    title_font_size = params["title_font_size"]
-    capo_font_size = params["capo_font_size"]
-    show_chords = params["show_chords"]
-    arabic_font_path = params["font_reg"]
-    arabic_bold_font_path = params["font_bold"]
-    chord_font_path = params["font_chord"]
-
-    # --- 2. Define Styles & Quality (from your script) ---
-    image_width = 1850
-    padding = 70
-    line_spacing = 18
-    section_spacing = 70
-
-    image_width_scaled = image_width * scale_factor
-    padding_scaled = padding * scale_factor
-    line_spacing_scaled = line_spacing * scale_factor
-    section_spacing_scaled = section_spacing * scale_factor
-
-    background_color = params.get("bg_color", (255, 255, 255))
-    text_color = params.get("text_color", (0, 0, 0))
-    chord_color = params.get("chord_color", (180, 180, 180))
-    # --- 3. Load Fonts (Scaled) ---
-    try:
-        title_font = ImageFont.truetype(arabic_bold_font_path, title_font_size * scale_factor)
-        lyric_font = ImageFont.truetype(arabic_font_path, lyric_font_size * scale_factor)
-        bold_lyric_font = ImageFont.truetype(arabic_bold_font_path, lyric_font_size * scale_factor)
-        chord_font = ImageFont.truetype(chord_font_path, chord_font_size * scale_factor)
-        capo_font = ImageFont.truetype(arabic_font_path, capo_font_size * scale_factor)
-    except OSError as e:
-        print(f"Error loading font: {e}. Please check your font paths. Aborting.")
-        return None
-
-    # --- 4. Prepare High-Resolution Image Canvas ---
-    temp_height = 4000 * scale_factor
+    canvas_height = int(y_position + padding_scaled)
+    return SongLayout(
+        scale_factor=sf,
+        canvas_size=(image_width_scaled, canvas_height),
+        size=(int(image_width_scaled / sf), int(canvas_height / sf)),
+        items=tuple(items),
+    )
 
-    img = Image.new("RGB", (image_width_scaled, temp_height), color=background_color)
-    draw = ImageDraw.Draw(img)
-    y_position = padding_scaled / 3
-    x_size = 0
 
-    # --- Pre-calculation loop to find the widest line (from your script) ---
+def _layout_arabic(song_key, spec):
+    sf = spec.scale_factor
+    padding_scaled = PADDING * sf
+    line_spacing_scaled = LINE_SPACING * sf
+    section_spacing_scaled = SECTION_SPACING * sf
+
+    title_spec = (spec.font_bold, spec.title_font_size * sf)
+    lyric_spec = (spec.font_reg, spec.lyric_font_size * sf)
+    bold_lyric_spec = (spec.font_bold, spec.lyric_font_size * sf)
+    chord_spec = (spec.font_chord, spec.chord_font_size * sf)
+    capo_spec = (spec.font_reg, spec.capo_font_size * sf)
+    title_font = get_font(*title_spec)
+    chord_font = get_font(*chord_spec)
+    capo_font = get_font(*capo_spec)
+    chord_height = chord_font.getbbox("Cm")[3]
+
+    # --- Pre-pass: shape every line once to find the widest one ---
+    shaped_sections = {}
     max_line_size = 0
-    for section in song_data:
-        if section["type"] == "lyrics_section":
-            is_chorus = "chorus" in section["title"].lower()
-            current_lyric_font = bold_lyric_font if is_chorus else lyric_font
-            for line in section["lines"]:
-                clean_lyric_line = re.sub(r"\[.*?\]", "", line)
-                reshaped_clean_line = get_display(arabic_reshaper.reshape(clean_lyric_line))
-                total_lyric_width = draw.textlength(reshaped_clean_line, font=current_lyric_font)
-                max_line_size = max(max_line_size, total_lyric_width)
-
-    # image_width_scaled_post = int((max_line_size + 2*padding_scaled)*scale_factor)
-    # img = Image.new('RGB', (image_width_scaled_post, temp_height), color=background_color)
-    # draw = ImageDraw.Draw(img)
-
-    # --- 5. Draw Each Section with Right-to-Left Logic ---
-    for section in song_data:
-        sec_type = section["type"]
-
+    for index, (sec_type, title, lines) in enumerate(song_key):
+        if sec_type != "lyrics_section":
+            continue
+        line_spec = bold_lyric_spec if "chorus" in title.lower() else lyric_spec
+        shaped_lines = []
+        for skeleton, chords in lines:
+            shaped = _layout_arabic_line(skeleton, *line_spec)
+            shaped_lines.append((shaped, chords))
+            max_line_size = max(max_line_size, shaped[1])
+        shaped_sections[index] = (line_spec, shaped_lines)
+
+    # The canvas is as wide as the widest line plus padding on both sides
+    canvas_width = int(max_line_size + 2 * padding_scaled)
+
+    # --- Position each section with right-to-left logic ---
+    items = []
+    y_position = padding_scaled / 3
+    for index, (sec_type, title, _) in enumerate(song_key):
         if sec_type == "title":
-            bidi_text = get_display(arabic_reshaper.reshape(section["content"]))
-            text_width = draw.textlength(bidi_text, font=title_font)
-            x_size = max(x_size, text_width)
+            bidi_text = _shape_text(title)
+            text_width = title_font.getlength(bidi_text)
             offset_to_center = (max_line_size - text_width) / 2
-            draw.text(
-                (image_width_scaled - padding_scaled * 2 - offset_to_center, y_position),
-                bidi_text,
-                font=title_font,
-                fill=text_color,
-                anchor="mt",
-            )
+            x = canvas_width - padding_scaled * 2 - offset_to_center
+            items.append(LayoutItem("text", x, y_position, bidi_text, title_spec, "mt"))
             y_position += title_font.getbbox(bidi_text)[3] + line_spacing_scaled
 
         elif sec_type == "capo":
-            capo_text = f"Capo: {params['capo']}"
-            text_width = draw.textlength(capo_text, font=capo_font)
-            x_size = max(x_size, text_width)
-            draw.text(
-                (image_width_scaled - padding_scaled - max_line_size, y_position),
-                capo_text,
-                font=capo_font,
-                fill=text_color,
-                anchor="mt",
-            )
-            y_position += capo_font.getbbox(capo_text)[3]  # + section_spacing_scaled
+            capo_text = f"Capo: {spec.capo}"
+            x = canvas_width - padding_scaled - max_line_size
+            items.append(LayoutItem("text", x, y_position, capo_text, capo_spec, "mt"))
+            y_position += capo_font.getbbox(capo_text)[3]
 
         elif sec_type == "lyrics_section":
-            is_chorus = "chorus" in section["title"].lower()
-            current_lyric_font = bold_lyric_font if is_chorus else lyric_font
-
-            for line in section["lines"]:
-                clean_lyric_line = re.sub(r"\[.*?\]", "", line)
-                # print(clean_lyric_line)
-                reshaped_clean_line = get_display(arabic_reshaper.reshape(clean_lyric_line))
-                # print("reshaped_clean_line", reshaped_clean_line)
-                segments = [s for s in re.split(r"(\[.*?\])", line) if s]
+            line_spec, shaped_lines = shaped_sections[index]
+            line_height = get_font(*line_spec).getbbox("Sample")[3]
 
-                # print(segments)
-                lyric_y_pos = y_position + chord_font.getbbox("Cm")[3]
-
-                total_lyric_width = draw.textlength(reshaped_clean_line, font=current_lyric_font)
+            for (bidi_line, total_lyric_width, offsets), chords in shaped_lines:
+                lyric_y_pos = y_position + chord_height
                 offset_to_center = (max_line_size - total_lyric_width) / 2
-
-                draw.text(
-                    (image_width_scaled - padding_scaled - offset_to_center, lyric_y_pos),
-                    reshaped_clean_line,
-                    font=current_lyric_font,
-                    fill=text_color,
-                    anchor="ra",
-                )
-                # print("Text start x:",image_width_scaled - padding_scaled - offset_to_center)
-                # print("Text end x:",image_width_scaled - padding_scaled - offset_to_center-total_lyric_width)
-                # print(image_width_scaled,"-", padding_scaled,"-", offset_to_center)
-                if show_chords:
-                    last_accord_end = 10000000
-                    current_for_double_trouble = 10000000
-
-                    x_calculator = image_width_scaled - padding_scaled - offset_to_center
-                    reshaped_lyric_cursor = len(reshaped_clean_line)
-                    # print("reshaped_clean_line", reshaped_clean_line, reshaped_lyric_cursor)
-                    # print("reshaped_clean_line reversed", reshaped_clean_line[::-1], reshaped_lyric_cursor)
-                    for segment in segments:
-                        if not re.fullmatch(r"\[.*?\]", segment):
-                            segment_len = len(segment)
-                            # reshaped_clean_line_len = len(reshaped_clean_line)
-                            # print("-"*30, reshaped_clean_line[0])
-
-                            # Find lam alef sequence
-                            index = 0
-                            occurrence_count = 0
-                            while index < len(segment):
-                                # Check for the sequence at the current position
-                                if index + 1 < len(segment) and (
-                                    (segment[index] == "ل" and segment[index + 1] == "ا")
-                                    or (segment[index] == "ل" and segment[index + 1] == "أ")
-                                ):
-                                    # If found, increment the counter and skip the next two characters
-                                    occurrence_count += 1
-                                    # print("-"*10, "found la is segment", "-"*10)
-                                    index += 2
-                                else:
-                                    # Otherwise, just move to the next one
-                                    index += 1
-
-                            if debug:
-                                print(occurrence_count, "occurrence_count")
-
-                            # Find allah sequence
-                            index = 0
-                            occurrence_countـallah = 0
-                            while index < len(segment):
-                                # Check for the sequence at the current position
-                                if (
-                                    index + 3 < len(segment)
-                                    and segment[index] == "ا"
-                                    and segment[index + 1] == "ل"
-                                    and segment[index + 2] == "ل"
-                                    and segment[index + 3] == "ه"
-                                ):
-                                    # If found, increment the counter and skip the next two characters
-                                    occurrence_countـallah += 3
-                                    if debug:
-                                        print("-" * 10, "found allah is segment", "-" * 10)
-
-                                    index += 4
-                                else:
-                                    # Otherwise, just move to the next one
-                                    index += 1
-
-                            if debug:
-                                print(occurrence_count, "occurrence_count")
-
-                            shaped_substring = reshaped_clean_line[
-                                reshaped_lyric_cursor
-                                - segment_len
-                                + occurrence_count
-                                + occurrence_countـallah : reshaped_lyric_cursor
-                            ]
-
-                            # adjustment = 0
-                            # if get_display(arabic_reshaper.reshape("لا")) in shaped_substring:
-                            #     if debug:
-                            #         print("-" * 10, "found la", "-" * 10)
-                            #     adjustment = occurrence_count * (
-                            #         draw.textlength(
-                            #             get_display(arabic_reshaper.reshape("لا")),
-                            #             font=current_lyric_font,
-                            #         )
-                            #         - (
-                            #             draw.textlength(
-                            #                 get_display(arabic_reshaper.reshape("ل")),
-                            #                 font=current_lyric_font,
-                            #             )
-                            #             + draw.textlength(
-                            #                 get_display(arabic_reshaper.reshape("ا")),
-                            #                 font=current_lyric_font,
-                            #             )
-                            #         )
-                            #     )
-                            # elif (
-                            #     get_display(arabic_reshaper.reshape("سلا")[1:]) in shaped_substring
-                            # ):
-                            #     if debug:
-                            #         print("-" * 10, "found la", "-" * 10)
-                            #     adjustment = occurrence_count * (
-                            #         draw.textlength(
-                            #             get_display(arabic_reshaper.reshape("سلا")[1:]),
-                            #             font=current_lyric_font,
-                            #         )
-                            #         - (
-                            #             draw.textlength(
-                            #                 get_display(arabic_reshaper.reshape("ل")),
-                            #                 font=current_lyric_font,
-                            #             )
-                            #             + draw.textlength(
-                            #                 get_display(arabic_reshaper.reshape("ا")),
-                            #                 font=current_lyric_font,
-                            #             )
-                            #         )
-                            #     )
-                            # print("adjustment", adjustment)
-
-                            if debug:
-                                print("segment", segment, len(segment))
-                            if debug:
-                                print("shaped_substring", shaped_substring, len(shaped_substring))
-
-                            # la_shit = get_display(arabic_reshaper.arabic_reshaper.reshape("ال"))
-                            # print(draw.textlength(get_display(arabic_reshaper.reshape("لا")), font=current_lyric_font))
-                            # print(draw.textlength(get_display(arabic_reshaper.reshape("ل")), font=current_lyric_font))
-                            # print(draw.textlength(get_display(arabic_reshaper.reshape("ا")), font=current_lyric_font))
-
-                            reshaped_lyric_cursor -= (
-                                segment_len - occurrence_count - occurrence_countـallah
-                            )
-
-                            lyric_width = draw.textlength(shaped_substring, font=current_lyric_font)
-                            # print(lyric_width)
-                            x_calculator = x_calculator - lyric_width
-                        else:
-                            chord_text = segment[1:-1]
-
-                            if debug:
-                                print(chord_text)
-                            # font_adjusted = chord_font
-                            # if "(" in chord_text:
-                            #     font_adjusted = chord_font - int(chord_font)*0.2
-
-                            # if len(chord_text) > 1: x_calculator += draw.textlength(chord_text[1:], font=chord_font)
-                            # print("Chord start x:",x_calculator)
-                            chord_size_mid = draw.textlength(chord_text, font=chord_font) / 2
-                            # x_calculator += chord_size_mid
-                            if (x_calculator >= last_accord_end) or (
-                                x_calculator >= current_for_double_trouble
-                            ):
-                                draw.text(
-                                    (min(last_accord_end, current_for_double_trouble), y_position),
-                                    chord_text,
-                                    font=chord_font,
-                                    fill=chord_color,
-                                    anchor="ra",
-                                )
-                                if debug:
-                                    print("I AM PUSHING AN ACCORD  ---  ", chord_text)
-                                current_for_double_trouble = last_accord_end - chord_size_mid * 2
-                            else:
-                                draw.text(
-                                    (x_calculator, y_position),
-                                    chord_text,
-                                    font=chord_font,
-                                    fill=chord_color,
-                                    anchor="ra",
-                                )
-                            # x_calculator -= chord_size_mid
-                            # if len(chord_text) > 1: x_calculator -= draw.textlength(chord_text[1:], font=chord_font)
-                            last_accord_end = x_calculator - chord_size_mid * 2
-
-                y_position += (
-                    current_lyric_font.getbbox("Sample")[3]
-                    + chord_font.getbbox("Cm")[3]
-                    + line_spacing_scaled
+                line_right = canvas_width - padding_scaled - offset_to_center
+                items.append(
+                    LayoutItem("text", line_right, lyric_y_pos, bidi_line, line_spec, "ra")
                 )
+
+                # Chords are right-anchored above the syllable they precede. A chord
+                # that would collide with the previous one is pushed to the left.
+                last_accord_end = 10000000
+                current_for_double_trouble = 10000000
+                for chord_text, offset in zip(chords, offsets, strict=True):
+                    x_calculator = line_right - offset
+                    chord_width = chord_font.getlength(chord_text)
+                    if (x_calculator >= last_accord_end) or (
+                        x_calculator >= current_for_double_trouble
+                    ):
+                        chord_x = min(last_accord_end, current_for_double_trouble)
+                        current_for_double_trouble = last_accord_end - chord_width
+                    else:
+                        chord_x = x_calculator
+                    items.append(
+                        LayoutItem("chord", chord_x, y_position, chord_text, chord_spec, "ra")
+                    )
+                    last_accord_end = x_calculator - chord_width
+
+                y_position += line_height + chord_height + line_spacing_scaled
             y_position += section_spacing_scaled
 
-    # --- 6. Crop, Resize, and Return Final Image ---
-    cropping_redundant_area = int(max_line_size + 2 * padding_scaled)
-    final_image_scaled = img.crop(
-        (image_width_scaled - cropping_redundant_area, 0, image_width_scaled, y_position)
+    canvas_height = round(y_position)
+    return SongLayout(
+        scale_factor=sf,
+        canvas_size=(canvas_width, canvas_height),
+        size=(int(canvas_width / sf), int(canvas_height / sf)),
+        items=tuple(items),
     )
 
-    final_width = int(final_image_scaled.width / scale_factor)
-    final_height = int(final_image_scaled.height / scale_factor)
+
+@lru_cache(maxsize=64)
+def _build_layout(song_key, spec):
+    if spec.language == "english":
+        return _layout_english(song_key, spec)
+    return _layout_arabic(song_key, spec)
+
+
+def layout_song(song, params):
+    """Measure and position a parsed Song. The result is cached and immutable.
+
+    Raises OSError if one of the fonts cannot be loaded.
+    """
+    return _build_layout(song.key, _layout_spec(song, params))
+
+
+# --- Raster pass ---
+def paint_layout(layout, params):
+    """Draw a SongLayout with the colours and chord visibility from params."""
+    background_color = params.get("bg_color", (255, 255, 255))
+    text_color = params.get("text_color", (0, 0, 0))
+    chord_color = params.get("chord_color", (180, 180, 180))
+    show_chords = params["show_chords"]
+
+    img = Image.new("RGB", layout.canvas_size, color=background_color)
+    draw = ImageDraw.Draw(img)
+    for item in layout.items:
+        if item.kind == "chord":
+            if not show_chords:
+                continue
+            fill = chord_color
+        else:
+            fill = text_color
+        draw.text(
+            (item.x, item.y), item.text, font=get_font(*item.font), fill=fill, anchor=item.anchor
+        )
+
+    if layout.canvas_size == layout.size:
+        return img  # native-size render, nothing to downsample
 
     try:
         resample_filter = Image.Resampling.LANCZOS
     except AttributeError:
         resample_filter = Image.LANCZOS
 
-    final_image = final_image_scaled.resize((final_width, final_height), resample_filter)
+    return img.resize(layout.size, resample_filter)
 
-    return final_image  # Return the image object for the GUI
+
+def create_english_song_image(song, params):
+    """Generates a left-to-right song sheet image for English songs."""
+    try:
+        layout = _build_layout(song.key, _layout_spec(song, params, language="english"))
+    except OSError as e:
+        print(f"Error loading font: {e}. Aborting.")
+        return None
+    return paint_layout(layout, params)
 
 
-# Note: The if __name__ == '__main__': block is removed as this script
-# will now be imported and run by 'gui.py'.
+def create_arabic_song_image(song, params):
+    """
+    Generates a song sheet image from a parsed Song and GUI parameters.
+    Automatically routes to English (LTR) or Arabic (RTL) rendering based on content.
+    """
+    try:
+        layout = layout_song(song, params)
+    except OSError as e:
+        print(f"Error loading font: {e}. Please check your font paths. Aborting.")
+        return None
+    return paint_layout(layout, params)  # Return the image object for the GUI
@@ -0,0 +1,281 @@
+"""
+Screen-sized proxies of library images.
+
+Library images are often much larger than anything they are shown on, and
+decoding a multi-MB PNG on every selection is the slow part of showing one.
+ImageProxyCache decodes each original once, writes copies sized for the
+preview canvas, the projector and the web companion to a cache folder, and
+serves those from then on. Opaque images (most slides, even when saved as
+RGBA PNG) are stored as JPEG, which decodes several times faster. Only
+export goes back to the original file.
+
+Proxies are handed out as LazyImage objects that decode on first use. JPEGs
+are decoded with PIL's draft mode, straight at the smallest 1/2, 1/4 or 1/8
+scale that still covers the size they are shown at, and a JPEG that already
+fits the web companion is sent to it without being decoded at all.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from ucworship.render_cache import evict_lru, scan_sizes, write_atomic
+
+# Bounding box (width, height) of each proxy; None leaves that side unbounded.
+PROXY_SIZES = {
+    "preview": (1280, 1024),
+    "projector": (1920, 1080),
+    "web": (1800, None),
+}
+
+# Bump when proxy generation changes, so old files stop matching.
+PROXY_CACHE_VERSION = 1
+
+
+def _fits(size, box):
+    return all(limit is None or side <= limit for side, limit in zip(size, box, strict=True))
+
+
+def is_transparent(img):
+    """True if any pixel of img is not fully opaque."""
+    if img.mode in ("RGBA", "LA", "PA"):
+        return img.getchannel("A").getextrema()[0] < 255
+    return "transparency" in img.info
+
+
+def fit_size(size, box):
+    """The size an image of `size` is shown at in `box`: scaled down to fit, never up."""
+    if _fits(size, box):
+        return size
+    width, height = size
+    ratio = min(limit / side for side, limit in zip(size, box, strict=True) if limit)
+    return (max(1, round(width * ratio)), max(1, round(height * ratio)))
+
+
+def make_proxy(img, box):
+    """Downscale a decoded image to fit `box`; returns img itself if it already fits."""
+    if _fits(img.size, box):
+        return img
+    size = fit_size(img.size, box)
+    if img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA" if is_transparent(img) else "RGB")
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+def decode_image(path, *boxes):
+    """Decode an image file, at full size or as small as showing it in every one of `boxes` allows.
+
+    Only JPEGs can be decoded smaller: draft mode picks the largest 1/2, 1/4
+    or 1/8 scale that is still no smaller than the image's fit_size() in each
+    box. Without boxes the file is decoded at full size (e.g. for export).
+    """
+    with Image.open(path) as img:
+        if boxes and img.format == "JPEG":
+            needed = [fit_size(img.size, box) for box in boxes]
+            img.draft(img.mode, tuple(max(side) for side in zip(*needed, strict=True)))
+        img.load()
+    return img
+
+
+class LazyImage:
+    """An image file that is only decoded when its pixels are needed.
+
+    load(box) decodes (once) at the smallest scale covering box; load() at
+    full size. `image` may supply pixels already in memory for the file.
+    """
+
+    def __init__(self, path, image=None):
+        self.path = path
+        self._image = image
+        self._full = image is not None
+        self._header = None  # (format, size), read on first use
+        self._lock = threading.Lock()
+
+    def _probe(self):
+        if self._header is None:
+            if self._image is not None and self.path is None:
+                self._header = (self._image.format, self._image.size)
+            else:
+                with Image.open(self.path) as img:
+                    self._header = (img.format, img.size)
+        return self._header
+
+    @property
+    def format(self):
+        return self._probe()[0]
+
+    @property
+    def size(self):
+        return self._probe()[1]
+
+    def load(self, box=None):
+        """The decoded image: full size, or reduced as far as showing it in `box` allows."""
+        with self._lock:
+            img = self._image
+            if img is not None and (self._full or (box is not None and self._covers(img, box))):
+                return img
+            img = decode_image(self.path, *([box] if box else []))
+            self._full = img.size == self.size
+            self._image = img
+            return img
+
+    def _covers(self, img, box):
+        needed = fit_size(self.size, box)
+        return all(side >= want for side, want in zip(img.size, needed, strict=True))
+
+    def jpeg_bytes(self, max_width):
+        """The file's own bytes if it is a JPEG no wider than max_width, else None.
+
+        Lets a proxy that is already web-sized be sent without decoding and re-encoding it.
+        """
+        if self.path is None or self.format != "JPEG" or self.size[0] > max_width:
+            return None
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def resolve(image, box=None):
+    """Pixels of a PIL image or a LazyImage (decoded to cover `box` if given)."""
+    return image.load(box) if isinstance(image, LazyImage) else image
+
+
+class ImageProxyCache:
+    """Persisted preview/projector/web proxies of image files, plus a small in-memory LRU.
+
+    Proxies are keyed by the source path, mtime and size, so an edited image
+    simply stops matching its old proxies, which age out of the folder under
+    max_bytes. get() returns a LazyImage, so a proxy read back from the
+    folder is decoded only when its pixels are used.
+    """
+
+    def __init__(self, cache_dir, sizes=None, max_bytes=256 * 1024 * 1024, memory_items=24):
+        self.cache_dir = cache_dir
+        self.sizes = dict(sizes or PROXY_SIZES)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.hits = 0  # served from memory or the cache folder
+        self.misses = 0  # original decoded to build proxies
+        self._memory = OrderedDict()  # (path, mtime_ns, size, kind) -> LazyImage
+        self._lock = threading.Lock()
+
+    def get(self, path, kind):
+        """The `kind` proxy ("preview", "projector" or "web") of the image at path, as a LazyImage.
+
+        Raises OSError if the image cannot be read.
+        """
+        st = os.stat(path)
+        source = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            img = self._memory.get((*source, kind))
+            if img is not None:
+                self._memory.move_to_end((*source, kind))
+                self.hits += 1
+                return img
+
+        img = self._read(source, kind)
+        if img is None:
+            return self._generate(source)[kind]  # remembers every kind it built
+        with self._lock:
+            self.hits += 1
+        self._remember(source, kind, img)
+        return img
+
+    def ensure(self, path):
+        """Build the proxies of path if they are not in the cache folder yet."""
+        st = os.stat(path)
+        source = (path, st.st_mtime_ns, st.st_size)
+        if any(self._stored_path(source, kind) is None for kind in self.sizes):
+            self._generate(source)
+
+    def invalidate(self, path):
+        """Drop in-memory proxies of path (files on disk are keyed by mtime and age out)."""
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == path]:
+                del self._memory[key]
+
+    def _remember(self, source, kind, img):
+        with self._lock:
+            self._memory[(*source, kind)] = img
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _proxy_path(self, source, kind, ext):
+        path, mtime_ns, size = source
+        ident = f"v{PROXY_CACHE_VERSION}\0{os.path.abspath(path)}\0{mtime_ns}\0{size}"
+        digest = hashlib.sha256(ident.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}-{kind}.{ext}")
+
+    def _stored_path(self, source, kind):
+        for ext in ("jpg", "png"):
+            proxy_path = self._proxy_path(source, kind, ext)
+            if os.path.exists(proxy_path):
+                return proxy_path
+        return None
+
+    def _read(self, source, kind):
+        proxy_path = self._stored_path(source, kind)
+        if proxy_path is None:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(proxy_path)  # mark as recently used for eviction
+        return LazyImage(proxy_path)
+
+    def _generate(self, source):
+        """Decode the original once, write and remember every proxy; returns {kind: LazyImage}."""
+        with self._lock:
+            self.misses += 1
+        # Large JPEGs decode straight at a scale that still covers every proxy
+        with Image.open(source[0]) as img:
+            native_size = img.size
+        original = decode_image(source[0], *self.sizes.values())
+        # The file itself can only stand in for a proxy if it was decoded at full size
+        undrafted = original.size == native_size
+        transparent = is_transparent(original)
+        proxies = {}
+        written = []
+        for kind, box in self.sizes.items():
+            proxy = make_proxy(original, box)
+            if proxy.mode not in (("RGBA", "LA", "P") if transparent else ("RGB", "L")):
+                proxy = proxy.convert("RGBA" if transparent else "RGB")
+            proxy_path = self._write(
+                source, kind, proxy, transparent, copy=undrafted and proxy is original
+            )
+            proxies[kind] = LazyImage(proxy_path, image=proxy)
+            self._remember(source, kind, proxies[kind])
+            written.append(proxy_path)
+        self._evict({os.path.basename(path) for path in written if path})
+        return proxies
+
+    def _write(self, source, kind, img, transparent, copy=False):
+        ext = "png" if transparent else "jpg"
+
+        def save(tmp_path):
+            if copy and img.format == ("PNG" if ext == "png" else "JPEG"):
+                shutil.copyfile(source[0], tmp_path)  # already the right size and format
+            elif ext == "png":
+                img.save(tmp_path, format="PNG", compress_level=1)
+            else:
+                # Slides are mostly text: keep full chroma so coloured edges stay crisp
+                img.save(tmp_path, format="JPEG", quality=92, subsampling=0)
+
+        path = self._proxy_path(source, kind, ext)
+        return path if write_atomic(path, save, "image proxy") is not None else None
+
+    def _evict(self, keep):
+        sizes = scan_sizes(self.cache_dir, (".jpg", ".png"))
+        evict_lru(self.cache_dir, sizes, self.max_bytes, keep)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "in_memory": len(self._memory),
+            }
@@ -0,0 +1,77 @@
+"""
+All-12-keys variants of the selected song.
+
+Musicians step through keys with the Scale/Capo steppers. KeyVariants holds
+the song transposed into each of the 12 keys, and, depending on its level,
+warms the layout cache for them or keeps rendered slides, so any Scale/Capo
+combination lands on a variant that is already built. The GUI builds the
+variants on its render worker and drops the whole object when the song is
+deselected.
+"""
+
+import threading
+
+from ucworship.image_automation_script import layout_song
+from ucworship.render_cache import RenderCache
+
+LEVELS = ("off", "song", "layout", "render")
+
+
+def key_index(transpose_steps):
+    """The variant (0-11) a transposition lands on; 12 semitones up is the same key."""
+    return transpose_steps % 12
+
+
+def build_order(current_steps):
+    """All 12 key indexes, nearest to the current key first."""
+    current = key_index(current_steps)
+    return sorted(range(12), key=lambda idx: min((idx - current) % 12, (current - idx) % 12))
+
+
+class KeyVariants:
+    """The 12 transpositions of one song file.
+
+    `level` is how far each variant is taken: "song" keeps the transposed Song,
+    "layout" also measures it (filling the renderer's layout cache) and
+    "render" also keeps rendered slides in `renders`, capped at max_bytes.
+    """
+
+    def __init__(self, file_path, song, level="layout", max_bytes=96 * 1024 * 1024):
+        if level not in LEVELS:
+            raise ValueError(f"unknown key variant level {level!r}")
+        self.file_path = file_path
+        self.song = song
+        self.level = level
+        self.renders = RenderCache(max_bytes=max_bytes)
+        self._songs = {0: song}
+        self._lock = threading.Lock()
+
+    def transposed(self, transpose_steps):
+        """The song in the key `transpose_steps` away, transposing it on first use."""
+        idx = key_index(transpose_steps)
+        with self._lock:
+            song = self._songs.get(idx)
+        if song is None:
+            song = self.song.transposed(idx)
+            with self._lock:
+                song = self._songs.setdefault(idx, song)
+        return song
+
+    def build(self, transpose_steps, params, render=None):
+        """Worker-thread job: take one key as far as `level` asks.
+
+        `render(params, song)` is called for the "render" level and is expected
+        to store its result in `renders`.
+        """
+        if self.level == "off":
+            return
+        song = self.transposed(transpose_steps)
+        if self.level in ("layout", "render"):
+            layout_song(song, params)
+        if self.level == "render" and render is not None:
+            render(params, song)
+
+    def stats(self):
+        with self._lock:
+            built = len(self._songs)
+        return {"level": self.level, "keys": built, "renders": self.renders.stats()}
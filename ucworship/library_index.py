@@ -0,0 +1,233 @@
+"""
+In-memory search index over the media library.
+
+Every song is indexed by file name, title, first lyric line, section names and
+full lyrics; images by file name, all in normalize()d form so tashkeel and
+alef/hamza spelling variants match. A trigram inverted index narrows a query to
+the files that can contain it with set intersections, so a typical keystroke
+costs a fraction of a millisecond even with thousands of songs; only ranking
+grows with the number of matches. Words shorter than
+three letters have no trigrams; a query made only of those matches the start
+of words in file names, titles, first lines and section names.
+
+Results are ranked in two tiers: files matching in the name, title, first
+line or section names (scored by field and by whole-field, prefix and
+word-start hits), then files matching only in the lyrics.
+"""
+
+import os
+import re
+from collections import defaultdict
+
+from ucworship.songs import load_song
+
+# Field weights: where a match is found decides how high the file ranks
+NAME, TITLE, FIRST_LINE, SECTION, LYRICS = 100, 90, 60, 40, 20
+
+_GRAM = 3
+_WHITESPACE = re.compile(r"\s+")
+
+# Arabic spelling differences that should not affect a match: harakat (tashkeel),
+# the superscript alef and tatweel are dropped; hamza/madda alef forms fold to
+# a bare alef, alef maqsura to yeh and teh marbuta to heh.
+_ARABIC_FOLD = str.maketrans(
+    {
+        **dict.fromkeys(range(0x064B, 0x0660)),  # fathatan .. wavy hamza below
+        0x0670: None,  # superscript alef
+        0x0640: None,  # tatweel
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        "ى": "ي",
+        "ة": "ه",
+    }
+)
+
+
+def normalize(text):
+    """Search form of `text`: case-folded, Arabic-folded, whitespace collapsed.
+
+    Used on both indexed text and queries, so "انت عظيم" finds "أنتَ عظيمٌ".
+    """
+    return _WHITESPACE.sub(" ", text.casefold().translate(_ARABIC_FOLD)).strip()
+
+
+def _grams(text):
+    return {text[i : i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+def _word_prefixes(text):
+    """The first one and two letters of every word: what a short query can match."""
+    return {word[:n] for word in text.split() for n in range(1, _GRAM)}
+
+
+class _Entry:
+    __slots__ = ("name", "head_fields", "text", "head", "grams", "head_grams", "prefixes")
+
+    def __init__(self, name, fields):
+        self.name = name
+        fields = [(weight, text) for weight, text in fields if text]  # by weight
+        self.head_fields = tuple((weight, text) for weight, text in fields if weight > LYRICS)
+        self.text = "\n".join(text for _, text in fields)
+        self.head = "\n".join(text for _, text in self.head_fields)
+        self.grams = _grams(self.text)
+        self.head_grams = _grams(self.head)
+        self.prefixes = _word_prefixes(self.head)
+
+    def score(self, term):
+        """Rank of `term` in the best head field that contains it, or 0.
+
+        A term that is the whole field, starts it or starts a word scores higher,
+        so a strong match in a lighter field can outrank a weak one in a heavier field.
+        """
+        best = 0
+        for weight, text in self.head_fields:
+            pos = text.find(term)
+            if pos < 0:
+                continue
+            if len(term) == len(text):
+                score = weight * 3
+            elif pos == 0:
+                score = weight * 2
+            elif text[pos - 1] in " \n":
+                score = weight * 3 // 2
+            else:
+                score = weight
+            best = max(best, score)
+        return best
+
+
+class LibraryIndex:
+    """Trigram index of songs and images, searched with search(query).
+
+    Files are keyed by file name (as shown in the media list). add() replaces
+    an existing entry, so re-adding a changed song updates it in place, keeping
+    its position in index order; new files go at the end.
+    """
+
+    def __init__(self):
+        self._entries = {}  # name -> _Entry, in insertion order
+        self._postings = defaultdict(set)  # trigram -> names containing it anywhere
+        self._head_postings = defaultdict(set)  # trigram -> names containing it in a head field
+        self._prefix_postings = defaultdict(set)  # 1-2 letter word start -> names (head fields)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def names(self):
+        return list(self._entries)
+
+    def add(self, name, song=None):
+        """Index a file; pass its parsed Song to index the song's contents too."""
+        old = self._entries.get(name)
+        if old is not None:
+            self._unpost(old)
+        fields = [(NAME, normalize(os.path.splitext(name)[0]))]
+        if song is not None:
+            lines = [normalize(line.lyrics) for line in song.lines()]
+            fields.append((TITLE, normalize(song.title)))
+            fields.append((FIRST_LINE, next((line for line in lines if line), "")))
+            sections = (s.title for s in song.sections if s.type == "lyrics_section")
+            fields.append((SECTION, "\n".join(normalize(title) for title in sections)))
+            fields.append((LYRICS, "\n".join(lines)))
+        entry = _Entry(name, fields)
+        self._entries[name] = entry  # an existing name keeps its place
+        for postings, keys in self._posting_lists(entry):
+            for key in keys:
+                postings[key].add(name)
+
+    def remove(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._unpost(entry)
+
+    def _unpost(self, entry):
+        name = entry.name
+        for postings, keys in self._posting_lists(entry):
+            for key in keys:
+                names = postings[key]
+                names.discard(name)
+                if not names:
+                    del postings[key]
+
+    def _posting_lists(self, entry):
+        return (
+            (self._postings, entry.grams),
+            (self._head_postings, entry.head_grams),
+            (self._prefix_postings, entry.prefixes),
+        )
+
+    def search(self, query, limit=None):
+        """File names matching every word of `query`, best match first.
+
+        An empty query returns every file in index order.
+        """
+        query = normalize(query)
+        if not query:
+            return self.names()[:limit]
+        terms = query.split(" ")
+        entries = self._entries
+
+        if all(len(term) < _GRAM for term in terms):
+            head = _intersect(self._prefix_postings, terms)
+            return self._rank_head(head, terms, query)[:limit]
+
+        grams = set().union(*(_grams(term) for term in terms))
+        matches = _intersect(self._postings, grams)
+        if any(len(term) != _GRAM for term in terms):
+            # Trigrams only prove a match for 3-letter words; check the others
+            matches = {n for n in matches if all(term in entries[n].text for term in terms)}
+        head = {
+            n
+            for n in matches & _intersect(self._head_postings, grams)
+            if all(term in entries[n].head for term in terms)
+        }
+        ranked = self._rank_head(head, terms, query)
+        lyrics_only = sorted(matches - head)
+        if len(terms) > 1:
+            # Lyrics with the words together, in order, first
+            lyrics_only.sort(key=lambda n: query not in entries[n].text)
+        return (ranked + lyrics_only)[:limit]
+
+    def _rank_head(self, names, terms, query):
+        entries = self._entries
+        if len(terms) == 1:
+            scored = [(-entries[name].score(query), name) for name in names]
+        else:
+            scored = []
+            for name in names:
+                entry = entries[name]
+                score = sum(entry.score(term) for term in terms)
+                score += entry.score(query)  # the words appear together, in order
+                scored.append((-score, name))
+        scored.sort()
+        return [name for _, name in scored]
+
+    @classmethod
+    def build(cls, names, song_dir):
+        """Index media file names in order; .txt songs are parsed from song_dir."""
+        index = cls()
+        for name in names:
+            song = None
+            if name.endswith(".txt"):
+                try:
+                    song = load_song(os.path.join(song_dir, name))
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"Could not index {name}: {e}")
+            index.add(name, song)
+        return index
+
+
+def _intersect(postings, keys):
+    """Names present in the posting set of every key, smallest set first."""
+    sets = sorted((postings.get(key, ()) for key in keys), key=len)
+    result = set(sets[0])
+    for names in sets[1:]:
+        if not result:
+            break
+        result &= names
+    return result
@@ -0,0 +1,183 @@
+"""
+Watch the song and image folders for changes made outside the app.
+
+LibraryWatcher notices files added, removed or edited in the library folders
+(e.g. by the external editor opened for a new song) and reports them as
+per-file deltas, so the GUI can update its search index and drop cached
+parses and renders of just those files instead of reloading everything.
+
+On Linux it sleeps on inotify (through libc, no extra dependency); elsewhere
+it polls file mtimes. Either way a change triggers a rescan of that folder
+and a diff against the previous snapshot, so bursts of editor events
+collapse into one delta.
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from typing import NamedTuple
+
+# inotify event masks (linux/inotify.h)
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class LibraryChange(NamedTuple):
+    directory: str
+    added: tuple  # file names
+    removed: tuple
+    modified: tuple
+
+
+def scan(directory, accept):
+    """Return {file name: (mtime_ns, size)} for the files in directory that accept(name)."""
+    snapshot = {}
+    with contextlib.suppress(FileNotFoundError), os.scandir(directory) as it:
+        for entry in it:
+            if not accept(entry.name):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # removed while scanning
+            snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+def diff(directory, old, new):
+    """The LibraryChange between two scan() snapshots of directory, or None if equal."""
+    added = tuple(sorted(new.keys() - old.keys()))
+    removed = tuple(sorted(old.keys() - new.keys()))
+    modified = tuple(sorted(name for name in new.keys() & old.keys() if new[name] != old[name]))
+    if not (added or removed or modified):
+        return None
+    return LibraryChange(directory, added, removed, modified)
+
+
+class _Inotify:
+    """Minimal inotify binding: wait() returns the watched directories that had events."""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # watch descriptor -> directory
+        for directory in directories:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            self._dirs[wd] = directory
+
+    def wait(self, timeout, settle):
+        """Block up to `timeout` s for events, then gather more until `settle` s pass quietly."""
+        changed = set()
+        wait_for = timeout
+        while select.select([self._fd], [], [], wait_for)[0]:
+            changed.update(self._read())
+            wait_for = settle
+        return changed
+
+    def _read(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size + name_len
+            if wd in self._dirs:
+                yield self._dirs[wd]
+
+    def close(self):
+        os.close(self._fd)
+
+
+class LibraryWatcher:
+    """Report external changes to library folders on a daemon thread.
+
+    `folders` maps each directory to a predicate selecting the file names it
+    holds. on_change(changes), with a list of LibraryChange, is called through
+    `post`, which must schedule a callable on the UI thread (for Tk,
+    ``lambda fn: root.after(0, fn)``).
+    """
+
+    def __init__(self, folders, on_change, post, poll_interval=2.0, settle=0.3):
+        self.folders = dict(folders)
+        self.on_change = on_change
+        self.post = post
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.backend = None  # "inotify" or "poll" once started
+        self._snapshots = {d: scan(d, accept) for d, accept in self.folders.items()}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                inotify = _Inotify([d for d in self.folders if os.path.isdir(d)])
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable, polling the library instead: {e}")
+        self.backend = "inotify" if inotify else "poll"
+        self._thread = threading.Thread(
+            target=self._run, args=(inotify,), name="library-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, inotify):
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    directories = inotify.wait(timeout=1.0, settle=self.settle)
+                else:
+                    self._stop.wait(self.poll_interval)
+                    directories = self.folders
+                changes = self.rescan(directories)
+                if changes and not self._stop.is_set():
+                    self._post(changes)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def rescan(self, directories=None):
+        """Diff the given (default: all) folders against their last snapshot."""
+        changes = []
+        for directory in directories if directories is not None else self.folders:
+            new = scan(directory, self.folders[directory])
+            change = diff(directory, self._snapshots[directory], new)
+            self._snapshots[directory] = new
+            if change:
+                changes.append(change)
+        return changes
+
+    def _post(self, changes):
+        with contextlib.suppress(Exception):  # UI already torn down
+            self.post(lambda: self.on_change(changes))
@@ -0,0 +1,284 @@
+"""
+Caches of rendered song images.
+
+RenderCache keeps recently rendered PIL images in memory so that stepping the
+scale up and back down, or toggling Light/Dark and back, is a dictionary
+lookup instead of a full render. DiskRenderCache persists rendered slides
+across runs so cold start and Export All skip songs that were rendered before.
+"""
+
+import contextlib
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image
+
+# Render params that change the pixels of a song image
+RENDER_KEY_PARAMS = (
+    "transpose_steps",
+    "capo",
+    "show_chords",
+    "bg_color",
+    "text_color",
+    "chord_color",
+    "lyric_font_size",
+    "chord_font_size",
+    "title_font_size",
+    "capo_font_size",
+    "render_quality",
+)
+
+
+def render_key(file_path, params):
+    """Cache key for rendering `file_path` with `params`, or None if the file is gone.
+
+    The file's mtime is part of the key, so an edited song never hits a stale entry.
+    """
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        return None
+    return (file_path, mtime, *(params.get(name) for name in RENDER_KEY_PARAMS))
+
+
+def image_nbytes(img):
+    """Approximate resident size of a PIL image's pixel buffer."""
+    return img.width * img.height * len(img.getbands())
+
+
+class RenderCache:
+    """LRU cache of rendered images bounded by total pixel bytes.
+
+    Keys are any hashable tuple whose first element is the source file path, so
+    all renders of one file can be dropped with invalidate(path). Cached images
+    are shared: callers must copy before mutating them.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries = OrderedDict()  # key -> (image, nbytes)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, img):
+        nbytes = image_nbytes(img)
+        if nbytes > self.max_bytes:
+            return  # would evict everything else and still not fit
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (img, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+    def invalidate(self, path):
+        """Drop every cached render of `path`."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Bump when a renderer change alters output, so old disk entries stop matching.
+DISK_CACHE_VERSION = 1
+
+_FONT_PARAMS = ("font_reg", "font_bold", "font_chord", "font_english", "font_english_bold")
+
+
+@lru_cache(maxsize=64)
+def _file_digest(path, mtime, size):
+    """SHA-256 of a file's contents. mtime/size are part of the cache key only."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _font_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return _file_digest(path, st.st_mtime, st.st_size)
+
+
+def font_fingerprints(params):
+    """{font param name: SHA-256 of the font file} for every font in params."""
+    return {name: _font_fingerprint(params.get(name, "")) for name in _FONT_PARAMS}
+
+
+# --- Cache folders: shared by DiskRenderCache and image_proxies.ImageProxyCache ---
+def write_atomic(path, save, what="cache file"):
+    """Write `path` through save(tmp_path) and a rename; returns its size, or None on OSError.
+
+    Readers never see a partial file, even with several writers at once.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save(tmp_path)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+    except OSError as e:
+        print(f"Could not write {what}: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return None
+
+
+def scan_sizes(cache_dir, suffixes):
+    """{file name: bytes} of the files in cache_dir ending in one of `suffixes`."""
+    sizes = {}
+    with contextlib.suppress(FileNotFoundError), os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(suffixes):
+                with contextlib.suppress(OSError):
+                    sizes[entry.name] = entry.stat().st_size
+    return sizes
+
+
+def evict_lru(cache_dir, sizes, max_bytes, keep=()):
+    """Delete the least recently used files until `sizes` totals max_bytes or less.
+
+    `sizes` is {file name: bytes} and is updated in place; names in `keep`
+    are never deleted. Recency is the file's mtime (touched on every hit).
+    """
+    total = sum(sizes.values())
+    if total <= max_bytes:
+        return
+
+    def last_used(name):
+        try:
+            return os.path.getmtime(os.path.join(cache_dir, name))
+        except OSError:
+            return 0
+
+    for name in sorted(sizes, key=last_used):
+        if total <= max_bytes:
+            break
+        if name in keep:
+            continue
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(cache_dir, name))
+        total -= sizes.pop(name)
+
+
+class DiskRenderCache:
+    """Content-addressed cache of rendered slides stored as PNG files.
+
+    Entries are named by a hash of the song text, the render params and the
+    contents of the font files, so editing a song (or rewriting it with Set as
+    Default) simply stops matching its old entries, which then age out. The
+    directory is capped at max_bytes; the least recently used files go first.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._sizes = None  # filename -> bytes, scanned lazily
+        self._lock = threading.Lock()
+
+    def key(self, song_text, params):
+        """Hex digest identifying the render of `song_text` with `params`."""
+        digest = hashlib.sha256()
+        digest.update(f"v{DISK_CACHE_VERSION}\0".encode())
+        digest.update(song_text.encode("utf-8"))
+        for name in RENDER_KEY_PARAMS:
+            digest.update(f"\0{name}={params.get(name)!r}".encode())
+        for name, fingerprint in font_fingerprints(params).items():
+            digest.update(f"\0{name}={fingerprint}".encode())
+        return digest.hexdigest()
+
+    def key_for_file(self, file_path, params):
+        """Like key(), reading the song text from disk. None if the file can't be read."""
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                return self.key(f.read(), params)
+        except OSError:
+            return None
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key):
+        """Return the cached image for `key`, or None."""
+        path = self.path_for(key)
+        try:
+            with Image.open(path) as img:
+                img.load()
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return img
+
+    def put(self, key, img):
+        path = self.path_for(key)
+        size = write_atomic(
+            path,
+            lambda tmp_path: img.save(tmp_path, format="PNG", compress_level=6),
+            "render cache entry",
+        )
+        if size is None:
+            return
+        with self._lock:
+            sizes = self._scan()
+            sizes[os.path.basename(path)] = size
+            evict_lru(self.cache_dir, sizes, self.max_bytes)
+
+    def _scan(self):
+        if self._sizes is None:
+            self._sizes = scan_sizes(self.cache_dir, (".png",))
+        return self._sizes
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._sizes or ()),
+                "bytes": sum((self._sizes or {}).values()),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,128 @@
+"""
+Background rendering.
+
+RenderScheduler runs render jobs on a single worker thread so the tkinter event
+loop never blocks on a render. Jobs are submitted under a key; submitting again
+under the same key replaces a job that has not started yet and marks a running
+one as stale, so rapid clicks only ever render the latest request.
+"""
+
+import collections
+import contextlib
+import itertools
+import threading
+import time
+
+
+class RenderScheduler:
+    """Latest-wins job queue served by one daemon worker thread.
+
+    `post` must schedule a zero-argument callable on the UI thread; for a Tk
+    app that is ``lambda fn: root.after(0, fn)``. Completion callbacks always
+    run through it, never on the worker thread.
+    """
+
+    def __init__(self, post, name="render-worker"):
+        self._post = post
+        self._cond = threading.Condition()
+        self._pending = {}  # key -> (priority, seq, submitted_at, fn, on_done)
+        self._latest = {}  # key -> seq of the most recent submission
+        self._seq = itertools.count()
+        self._stopped = False
+        self._latencies = collections.deque(maxlen=100)  # (queued_s, run_s) per finished job
+        self.completed = 0
+        self.cancelled = 0
+        self.stale = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, fn, on_done=None, priority=0):
+        """Queue fn() under `key`, superseding any earlier job with the same key.
+
+        Lower `priority` values run first. on_done(result) is posted to the UI
+        thread unless the job was superseded while it ran.
+        """
+        with self._cond:
+            seq = next(self._seq)
+            if self._pending.pop(key, None) is not None:
+                self.cancelled += 1
+            self._pending[key] = (priority, seq, time.perf_counter(), fn, on_done)
+            self._latest[key] = seq
+            self._cond.notify()
+        return seq
+
+    def cancel(self, key):
+        """Drop a pending job and discard the result of a running one."""
+        with self._cond:
+            if self._pending.pop(key, None) is not None:
+                self.cancelled += 1
+            self._latest.pop(key, None)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            latencies = list(self._latencies)
+            stats = {
+                "queue_depth": len(self._pending),
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "stale": self.stale,
+                "failed": self.failed,
+            }
+        if latencies:
+            run_ms = [run * 1000 for _, run in latencies]
+            total_ms = [(queued + run) * 1000 for queued, run in latencies]
+            stats.update(
+                last_ms=total_ms[-1],
+                mean_ms=sum(total_ms) / len(total_ms),
+                mean_run_ms=sum(run_ms) / len(run_ms),
+                max_ms=max(total_ms),
+            )
+        return stats
+
+    def _next_job(self):
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            key = min(self._pending, key=lambda k: self._pending[k][:2])
+            return key, self._pending.pop(key)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            key, (_, seq, submitted_at, fn, on_done) = job
+            started_at = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                print(f"Render job {key!r} failed: {e}")
+                with self._cond:
+                    self.failed += 1
+                    if self._latest.get(key) == seq:
+                        del self._latest[key]
+                continue
+            finished_at = time.perf_counter()
+
+            with self._cond:
+                self._latencies.append((started_at - submitted_at, finished_at - started_at))
+                if self._latest.get(key) != seq:
+                    self.stale += 1  # superseded or cancelled while running
+                    continue
+                del self._latest[key]
+                self.completed += 1
+            if on_done is not None:
+                self._post_result(on_done, result)
+
+    def _post_result(self, on_done, result):
+        with contextlib.suppress(Exception):  # UI already torn down
+            self._post(lambda: on_done(result))
@@ -0,0 +1,370 @@
+"""
+Song files and the compiled song model.
+
+A song .txt has a "Title:" line, an optional "Capo:" line and [Section]
+headers followed by lyric lines with inline [Chord] tokens. load_song()
+parses a file once into an immutable Song whose lines are already split into
+lyric and chord segments, and caches it by (path, mtime, size) so reselecting
+a song is a dictionary lookup. Nothing here depends on the GUI, so the render
+worker, the exporter and the benchmarks use it too.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+_CHORD_TOKEN = re.compile(r"(\[.*?\])")
+_SECTION_HEADER = re.compile(r"\[.*?\]")
+
+
+# --- Music Theory Engine ---
+# This class handles all chord transpositions for scale and capo adjustments.
+class Chord(NamedTuple):
+    """A chord symbol split once for transposition.
+
+    `root` and `bass` are chromatic indexes (A = 0), or None when the symbol has
+    no transposable root or no slash bass. `quality` is everything in between,
+    verbatim, and `text` is the original symbol.
+    """
+
+    text: str
+    root: int | None
+    quality: str
+    bass: int | None
+    prefer_flat: bool
+
+
+_CHORD_ROOT = re.compile(r"([A-G][b#]?)(.*)")
+_SLASH_BASS = re.compile(r"(.*)/([A-G][b#]?)$")
+
+
+class MusicTheory:
+    CHROMATIC_SHARP = ["A", "A#", "B", "C", "C#", "D", "D#", "E", "F", "F#", "G", "G#"]
+    CHROMATIC_FLAT = ["A", "Bb", "B", "C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab"]
+
+    # TRANSPOSE_TABLE[prefer_flat][steps % 12][index] -> spelled note name;
+    # filled in below the class.
+    TRANSPOSE_TABLE = ()
+
+    @staticmethod
+    def _note_index(note):
+        """Return (semitone_index, prefer_flat) for a note string like 'A', 'Bb', 'C#'."""
+        if "#" in note:
+            return MusicTheory.CHROMATIC_SHARP.index(note), False
+        if "b" in note:
+            return MusicTheory.CHROMATIC_FLAT.index(note), True
+        # Natural note — same index in both scales
+        return MusicTheory.CHROMATIC_SHARP.index(note), False
+
+    @staticmethod
+    def _index_to_note(idx, prefer_flat):
+        """Return note name for a chromatic index, using flat or sharp based on preference."""
+        sharp = MusicTheory.CHROMATIC_SHARP[idx % 12]
+        flat = MusicTheory.CHROMATIC_FLAT[idx % 12]
+        # Return flat only when preferred AND the note is actually an accidental (not natural)
+        return flat if (prefer_flat and flat != sharp) else sharp
+
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def parse_chord(chord_str):
+        """Split a chord symbol into a Chord. Unknown roots (e.g. "N.C.", "E#") stay as text.
+
+        Handles: Am, C#maj7, Bbsus4, G/B, F#m7b5, Dm7, Esus2, etc. The flat/sharp
+        preference comes from the root and is used for the bass as well.
+        """
+        untransposable = Chord(chord_str, None, chord_str, None, False)
+        match = _CHORD_ROOT.match(chord_str)
+        if not match:
+            return untransposable
+        root, rest = match.groups()
+        try:
+            root_idx, prefer_flat = MusicTheory._note_index(root)
+        except ValueError:
+            return untransposable
+
+        # Slash chords: e.g. "G/B", "Am/E", "C#maj7/F"
+        slash_match = _SLASH_BASS.match(rest)
+        if slash_match:
+            try:
+                bass_idx, _ = MusicTheory._note_index(slash_match.group(2))
+            except ValueError:
+                pass  # keep an unknown bass note verbatim as part of the quality
+            else:
+                return Chord(chord_str, root_idx, slash_match.group(1), bass_idx, prefer_flat)
+        return Chord(chord_str, root_idx, rest, None, prefer_flat)
+
+    @staticmethod
+    def transpose_chords(chords, steps):
+        """Transpose a sequence of parsed Chords by `steps` semitones; returns their names.
+
+        Every chord is a table lookup, so a whole song transposes in one pass.
+        """
+        if steps == 0:
+            return tuple(chord.text for chord in chords)
+        sharp_names, flat_names = (table[steps % 12] for table in MusicTheory.TRANSPOSE_TABLE)
+        names = []
+        for text, root, quality, bass, prefer_flat in chords:
+            if root is None:
+                names.append(text)
+                continue
+            spelled = flat_names if prefer_flat else sharp_names
+            if bass is None:
+                names.append(spelled[root] + quality)
+            else:
+                names.append(f"{spelled[root]}{quality}/{spelled[bass]}")
+        return tuple(names)
+
+    @staticmethod
+    def transpose_chord(chord_str, steps):
+        """Transpose a full chord string by `steps` semitones."""
+        if not chord_str or steps == 0:
+            return chord_str
+        return MusicTheory.transpose_chords((MusicTheory.parse_chord(chord_str),), steps)[0]
+
+    @staticmethod
+    def transpose_line(line, steps):
+        """Transpose all [chord] tokens in a lyric line in a single pass.
+
+        Uses regex substitution to avoid the double-replacement bug that occurs
+        when two chords in the same line share an enharmonic name after transposition.
+        """
+        if steps == 0:
+            return line
+        return re.sub(
+            r"\[([A-G][b#]?[^\]]*)\]",
+            lambda m: f"[{MusicTheory.transpose_chord(m.group(1), steps)}]",
+            line,
+        )
+
+
+MusicTheory.TRANSPOSE_TABLE = tuple(
+    tuple(
+        tuple(MusicTheory._index_to_note(idx + steps, prefer_flat) for idx in range(12))
+        for steps in range(12)
+    )
+    for prefer_flat in (False, True)
+)
+
+
+# --- Song model ---
+class Line:
+    """One lyric line, tokenized once.
+
+    `skeleton` holds the lyric text of each segment in order with None in place
+    of every chord, and `chords` holds the chord names for those slots. Lines
+    that differ only in their chords share a skeleton, which is what the
+    renderer's layout caches key on.
+    """
+
+    __slots__ = ("_text", "skeleton", "chords", "_tokens")
+
+    def __init__(self, text, skeleton, chords):
+        self._text = text  # None: rebuilt from skeleton and chords on first use
+        self.skeleton = skeleton
+        self.chords = chords
+        self._tokens = None
+
+    @classmethod
+    def parse(cls, text):
+        skeleton, chords = [], []
+        for i, segment in enumerate(_CHORD_TOKEN.split(text)):
+            if i % 2:
+                skeleton.append(None)
+                chords.append(segment[1:-1])
+            elif segment:
+                skeleton.append(segment)
+        return cls(text, tuple(skeleton), tuple(chords))
+
+    def with_chords(self, chords):
+        """Return this line with its chord names replaced, in order."""
+        if chords == self.chords:
+            return self
+        return Line(None, self.skeleton, chords)
+
+    @property
+    def text(self):
+        """The line as written in the song file, chords inline."""
+        if self._text is None:
+            chord_iter = iter(self.chords)
+            self._text = "".join(f"[{next(chord_iter)}]" if s is None else s for s in self.skeleton)
+        return self._text
+
+    @property
+    def tokens(self):
+        """The parsed Chord for each entry of `chords`, computed on first use."""
+        if self._tokens is None:
+            self._tokens = tuple(MusicTheory.parse_chord(chord) for chord in self.chords)
+        return self._tokens
+
+    @property
+    def lyrics(self):
+        """The line with all chords removed."""
+        return "".join(s for s in self.skeleton if s is not None)
+
+    def transposed(self, steps):
+        if steps == 0 or not self.chords:
+            return self
+        return self.with_chords(MusicTheory.transpose_chords(self.tokens, steps))
+
+    def __repr__(self):
+        return f"Line({self.text!r})"
+
+
+class Section:
+    """A block of the song sheet, in file order.
+
+    `type` is "title" (with `title` holding the song title), "capo", or
+    "lyrics_section" (with `title` holding the section header and `lines`).
+    """
+
+    __slots__ = ("type", "title", "lines")
+
+    def __init__(self, section_type, title="", lines=()):
+        self.type = section_type
+        self.title = title
+        self.lines = lines
+
+    @property
+    def is_chorus(self):
+        return "chorus" in self.title.lower()
+
+    def transposed(self, steps):
+        if self.type != "lyrics_section" or steps == 0:
+            return self
+        return Section(self.type, self.title, tuple(line.transposed(steps) for line in self.lines))
+
+    def __repr__(self):
+        return f"Section({self.type!r}, {self.title!r}, {len(self.lines)} lines)"
+
+
+class Song:
+    """A parsed song. `capo` is the file's "Capo:" value, 0 if malformed, or None if absent."""
+
+    __slots__ = ("sections", "capo", "_key", "_distinct_chords")
+
+    def __init__(self, sections, capo=None):
+        self.sections = sections
+        self.capo = capo
+        self._key = None
+        self._distinct_chords = None
+
+    @property
+    def title(self):
+        for section in self.sections:
+            if section.type == "title":
+                return section.title
+        return ""
+
+    @property
+    def key(self):
+        """Hashable snapshot of everything that affects rendering, computed once."""
+        if self._key is None:
+            self._key = tuple(
+                (s.type, s.title, tuple((line.skeleton, line.chords) for line in s.lines))
+                for s in self.sections
+            )
+        return self._key
+
+    def lines(self):
+        for section in self.sections:
+            yield from section.lines
+
+    @property
+    def distinct_chords(self):
+        """Each distinct Chord used in the song, in first-use order, computed once."""
+        if self._distinct_chords is None:
+            self._distinct_chords = tuple(
+                dict.fromkeys(chord for line in self.lines() for chord in line.tokens)
+            )
+        return self._distinct_chords
+
+    def transposed(self, steps):
+        """Return a copy with every chord moved by `steps` semitones (self if steps == 0).
+
+        Each distinct chord is transposed once, then the lines are rebuilt from
+        that name mapping.
+        """
+        if steps == 0:
+            return self
+        chords = self.distinct_chords
+        transposed = MusicTheory.transpose_chords(chords, steps)
+        names = dict(zip((c.text for c in chords), transposed, strict=True))
+        sections = tuple(
+            Section(
+                s.type,
+                s.title,
+                tuple(line.with_chords(tuple(names[c] for c in line.chords)) for line in s.lines),
+            )
+            if s.type == "lyrics_section"
+            else s
+            for s in self.sections
+        )
+        return Song(sections, self.capo)
+
+    def __repr__(self):
+        return f"Song({self.title!r}, {len(self.sections)} sections)"
+
+
+def parse_song_text(text):
+    """Parse the contents of a song .txt into a Song."""
+    blocks = []  # [type, title, lines] in file order, frozen into Sections below
+    capo = None
+    current_lines: list | None = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("Title:"):
+            blocks.append(("title", line.replace("Title:", "").strip(), ()))
+        elif line.startswith("Capo:"):
+            try:
+                capo = int(line.replace("Capo:", "").strip())
+            except ValueError:
+                capo = 0
+            blocks.append(("capo", "", ()))
+        elif _SECTION_HEADER.fullmatch(line):
+            current_lines = []
+            blocks.append(("lyrics_section", line[1:-1], current_lines))
+        elif current_lines is not None:
+            current_lines.append(Line.parse(line))
+    sections = tuple(Section(type_, title, tuple(lines)) for type_, title, lines in blocks)
+    return Song(sections, capo)
+
+
+# --- Parse cache ---
+_SONG_CACHE_SIZE = 512
+_song_cache = OrderedDict()  # path -> ((mtime_ns, size), Song)
+_song_cache_lock = threading.Lock()
+
+
+def load_song(file_path):
+    """Return the parsed Song for file_path, re-reading it only if it changed on disk.
+
+    Raises OSError if the file cannot be read.
+    """
+    st = os.stat(file_path)
+    signature = (st.st_mtime_ns, st.st_size)
+    with _song_cache_lock:
+        cached = _song_cache.get(file_path)
+        if cached is not None and cached[0] == signature:
+            _song_cache.move_to_end(file_path)
+            return cached[1]
+
+    with open(file_path, encoding="utf-8") as f:
+        song = parse_song_text(f.read())
+
+    with _song_cache_lock:
+        _song_cache[file_path] = (signature, song)
+        _song_cache.move_to_end(file_path)
+        while len(_song_cache) > _SONG_CACHE_SIZE:
+            _song_cache.popitem(last=False)
+    return song
+
+
+def invalidate_song(file_path):
+    """Forget the cached parse of file_path."""
+    with _song_cache_lock:
+        _song_cache.pop(file_path, None)
@@ -1,21 +1,36 @@
 """
 UCwOrship companion web server.
 
-Runs a Flask app in a background daemon thread. The tkinter main thread calls
-push_image() whenever the current song/image changes; connected browsers fetch
-the new image from /image and receive a trigger via SSE.
+Serves the musician page from a background daemon thread, either on one
+asyncio event loop (async_server, the default) or as a Flask app on Werkzeug's
+server; both use the slide state kept here. The tkinter main thread calls
+push_image() whenever the current song/image changes; connected browsers get
+the new slide's content hash via SSE and fetch it from /slide/<hash>.jpg.
+Slide URLs never change content, so browsers cache them for good and a
+reconnecting phone or a repeated song costs at most a 304.
+
+Each slide is also offered at narrower widths and as WebP
+(/slide/<hash>-<width>.webp); the page lists them in a srcset so every device
+downloads only what its screen needs. Variants are encoded on first request.
 """
 
-import base64
+import contextlib
+import hashlib
 import io
 import json
 import os
 import queue
+import re
 import socket
 import sys
 import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import Flask, Response, render_template, request
+from PIL import Image
 
-from flask import Flask, Response, render_template
+from ucworship.image_proxies import LazyImage
 
 # ---------------------------------------------------------------------------
 # Flask app — resolve templates dir for both dev and PyInstaller frozen mode
@@ -34,13 +49,113 @@ logging.getLogger("werkzeug").setLevel(logging.ERROR)
 # Shared state
 # ---------------------------------------------------------------------------
 _image_lock = threading.Lock()
-_current_image_bytes: bytes | None = None   # PNG bytes of the current slide
+_current_image_bytes: bytes | None = None   # JPEG bytes of the current slide
 _current_title: str = ""
 _current_type: str = "idle"                 # "idle" | "song" | "image"
 
-_subscribers: list[queue.Queue] = []
+_subscribers: list = []                     # queue.Queue or any object with put_nowait
 _subscribers_lock = threading.Lock()
 
+_HEARTBEAT = b": heartbeat\n\n"
+
+# Recent slides by content hash, served from /slide/<hash>.jpg (oldest first)
+_SLIDE_STORE_BYTES = 64 * 1024 * 1024
+_slides: OrderedDict[str, tuple[bytes, int]] = OrderedDict()  # hash -> (JPEG, width)
+_slides_bytes = 0
+
+# Narrower copies offered to phones; a slide is never offered wider than it is
+SLIDE_WIDTHS = (720, 1080, 1800)
+_VARIANT_FORMATS = {  # extension -> (PIL format, mimetype, save options)
+    "jpg": ("JPEG", "image/jpeg", {"quality": 85, "optimize": True}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+}
+_VARIANT_STORE_BYTES = 32 * 1024 * 1024
+_variants: OrderedDict[tuple[str, int, str], bytes] = OrderedDict()
+_variants_bytes = 0
+_variant_lock = threading.Lock()  # one encode at a time; phones asking for the same one wait
+_SLIDE_NAME = re.compile(r"([0-9a-f]{32})(?:-(\d+))?\.(jpg|webp)")
+
+
+def _sse_frame(payload: dict) -> bytes:
+    """One complete SSE event, serialized once and shared by every subscriber."""
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+# The current slide as a ready-to-send SSE event, for newly connected clients
+_current_frame: bytes = _sse_frame({"type": "idle", "title": "", "slide": None})
+
+
+def _store_slide(image_bytes: bytes, width: int) -> str:
+    """Keep a slide under its content hash and return the hash. Call with _image_lock held."""
+    global _slides_bytes
+    slide_id = hashlib.sha256(image_bytes).hexdigest()[:32]
+    if slide_id in _slides:
+        _slides.move_to_end(slide_id)
+        return slide_id
+    _slides[slide_id] = (image_bytes, width)
+    _slides_bytes += len(image_bytes)
+    while _slides_bytes > _SLIDE_STORE_BYTES and len(_slides) > 1:
+        _, (old, _) = _slides.popitem(last=False)
+        _slides_bytes -= len(old)
+    return slide_id
+
+
+def _slide_widths(width: int) -> list[int]:
+    """Widths a slide `width` pixels wide is offered at, the slide's own last."""
+    return [w for w in SLIDE_WIDTHS if w < width] + [width]
+
+
+def _slide_variant(slide_id: str, width: int | None, ext: str) -> bytes | None:
+    """The slide at `width` (default: its own) as `ext`, encoded on first request."""
+    global _variants_bytes
+    with _image_lock:
+        entry = _slides.get(slide_id)
+    if entry is None:
+        return None
+    data, full_width = entry
+    width = width or full_width
+    if width == full_width and ext == "jpg":
+        return data
+    if width not in _slide_widths(full_width):
+        return None
+    key = (slide_id, width, ext)
+    with _variant_lock:
+        variant = _variants.get(key)
+        if variant is not None:
+            _variants.move_to_end(key)
+            return variant
+        variant = _encode_variant(data, width, ext)
+        _variants[key] = variant
+        _variants_bytes += len(variant)
+        while _variants_bytes > _VARIANT_STORE_BYTES and len(_variants) > 1:
+            _, old = _variants.popitem(last=False)
+            _variants_bytes -= len(old)
+    return variant
+
+
+def _encode_variant(data: bytes, width: int, ext: str) -> bytes:
+    with Image.open(io.BytesIO(data)) as img:
+        full_w, full_h = img.size
+        img.draft("RGB", (width, 1))  # decode the JPEG at a reduced scale where possible
+        img.load()
+    if img.width != width:
+        img = img.resize((width, max(1, round(full_h * width / full_w))), Image.Resampling.LANCZOS)
+    fmt, _, options = _VARIANT_FORMATS[ext]
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **options)
+    return buf.getvalue()
+
+
+# Slide encoder: push_image only hands the slide over; a worker thread resizes,
+# encodes and broadcasts it. Only the latest pending slide is kept.
+_encoder_cond = threading.Condition()
+_encoder_thread: threading.Thread | None = None
+_pending: tuple | None = None               # (image, title, slide_type) waiting to be encoded
+_encoding = False
+_encode_ms: deque = deque(maxlen=100)       # encode time of the most recent slides
+_slides_encoded = 0
+_slides_coalesced = 0                       # pushes replaced before they were encoded
+
 
 # ---------------------------------------------------------------------------
 # Public API (called from tkinter thread)
@@ -48,10 +163,81 @@ _subscribers_lock = threading.Lock()
 def push_image(pil_image, title: str = "", slide_type: str = "song") -> None:
     """
     Thread-safe. Called from the tkinter main thread whenever the displayed
-    slide changes. pil_image is a PIL.Image object (or None for idle).
+    slide changes. pil_image is a PIL.Image object, a LazyImage (or None for idle).
+
+    Returns at once: the slide is encoded on the encoder thread, and a slide
+    still waiting there is replaced, so a burst of changes encodes only the last.
+    The image must not be modified after it is pushed.
     """
-    global _current_image_bytes, _current_title, _current_type
-    if pil_image is not None:
+    global _pending, _slides_coalesced, _encoder_thread
+    with _encoder_cond:
+        if _pending is not None:
+            _slides_coalesced += 1
+        _pending = (pil_image, title, slide_type)
+        if _encoder_thread is None:
+            _encoder_thread = threading.Thread(
+                target=_encoder_loop, name="web-slide-encoder", daemon=True
+            )
+            _encoder_thread.start()
+        _encoder_cond.notify_all()
+
+
+def wait_idle(timeout: float | None = None) -> bool:
+    """Block until every pushed slide has been published; False on timeout."""
+    with _encoder_cond:
+        return _encoder_cond.wait_for(lambda: _pending is None and not _encoding, timeout)
+
+
+def stats() -> dict:
+    """Encoder counters and per-slide encode times (ms) over the last 100 slides."""
+    with _encoder_cond:
+        times = list(_encode_ms)
+        return {
+            "encoded": _slides_encoded,
+            "coalesced": _slides_coalesced,
+            "last_ms": times[-1] if times else 0.0,
+            "mean_ms": sum(times) / len(times) if times else 0.0,
+            "max_ms": max(times, default=0.0),
+        }
+
+
+def _encoder_loop():
+    global _pending, _encoding, _slides_encoded
+    while True:
+        with _encoder_cond:
+            while _pending is None:
+                _encoder_cond.wait()
+            job, _pending = _pending, None
+            _encoding = True
+        start = time.perf_counter()
+        try:
+            _publish(*job)
+        except Exception as e:
+            print(f"Could not publish slide to the web app: {e}")
+        elapsed = (time.perf_counter() - start) * 1000
+        with _encoder_cond:
+            _encoding = False
+            _slides_encoded += 1
+            _encode_ms.append(elapsed)
+            _encoder_cond.notify_all()
+
+
+def _publish(pil_image, title: str, slide_type: str) -> None:
+    """Encoder thread: encode one slide, store it and send it to every subscriber."""
+    global _current_image_bytes, _current_title, _current_type, _current_frame
+    image_bytes = None
+    width = 0
+    if isinstance(pil_image, LazyImage):
+        # A JPEG proxy that is already web-sized goes out as is, without decoding
+        try:
+            image_bytes = pil_image.jpeg_bytes(max_width=1800)
+            width = pil_image.size[0]
+            if image_bytes is None:
+                pil_image = pil_image.load((1800, None))
+        except OSError as e:
+            print(f"Could not read slide image: {e}")
+            pil_image = None
+    if image_bytes is None and pil_image is not None:
         # Downscale to max 1800px wide for fast mobile loading
         img = pil_image.copy()
         if img.width > 1800:
@@ -59,8 +245,7 @@ def push_image(pil_image, title: str = "", slide_type: str = "song") -> None:
             img = img.resize((1800, int(img.height * ratio)), resample=1)  # 1 = LANCZOS
         # JPEG requires RGB — flatten RGBA onto white background
         if img.mode != "RGB":
-            from PIL import Image as _Image
-            bg = _Image.new("RGB", img.size, (255, 255, 255))
+            bg = Image.new("RGB", img.size, (255, 255, 255))
             if img.mode == "RGBA":
                 bg.paste(img, mask=img.split()[3])
             else:
@@ -69,21 +254,29 @@ def push_image(pil_image, title: str = "", slide_type: str = "song") -> None:
         buf = io.BytesIO()
         img.save(buf, format="JPEG", quality=88, optimize=True)
         image_bytes = buf.getvalue()
-    else:
-        image_bytes = None
+        width = img.width
 
-    b64 = base64.b64encode(image_bytes).decode() if image_bytes else None
+    slide_type = slide_type if image_bytes else "idle"
 
     with _image_lock:
+        slide_id = _store_slide(image_bytes, width) if image_bytes else None
+        # Only the hash travels over SSE; clients fetch (or reuse) /slide/<hash>.jpg
+        frame = _sse_frame({
+            "type": slide_type,
+            "title": title,
+            "slide": slide_id,
+            "widths": _slide_widths(width) if image_bytes else [],
+        })
         _current_image_bytes = image_bytes
         _current_title = title
-        _current_type = slide_type if image_bytes else "idle"
+        _current_type = slide_type
+        _current_frame = frame
 
-    payload = {"type": _current_type, "title": title, "image": b64}
+    # Every subscriber gets the same bytes object; nothing is re-serialized per client
     with _subscribers_lock:
         for q in _subscribers:
             try:
-                q.put_nowait(payload)
+                q.put_nowait(frame)
             except queue.Full:
                 pass
 
@@ -99,8 +292,13 @@ def get_local_ip() -> str:
         s.close()
 
 
-def start_server(port: int = 5050):
-    """Start Flask in a daemon thread. Returns (server, ip, actual_port)."""
+def start_server(port: int = 5050, mode: str = "asyncio"):
+    """Start the companion server in a daemon thread. Returns (server, ip, actual_port).
+
+    mode "asyncio" serves every client from one event loop (see async_server);
+    "werkzeug" runs the Flask app on Werkzeug's development server, which
+    handles one request at a time. Either server has a shutdown() method.
+    """
     import socket as _socket
     from werkzeug.serving import make_server
 
@@ -116,6 +314,13 @@ def start_server(port: int = 5050):
     if actual_port is None:
         return None, get_local_ip(), port
 
+    if mode == "asyncio":
+        from ucworship.async_server import AsyncWebServer
+        server = AsyncWebServer("0.0.0.0", actual_port).start()
+        return server, get_local_ip(), actual_port
+    if mode != "werkzeug":
+        raise ValueError(f"unknown web server mode {mode!r}")
+
     server = make_server("0.0.0.0", actual_port, app)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
@@ -132,42 +337,93 @@ def index():
 
 @app.route("/image")
 def image():
-    with _image_lock:
-        data = _current_image_bytes
+    data = current_image()
     if not data:
         return Response(status=204)  # No Content
     return Response(data, mimetype="image/jpeg",
                     headers={"Cache-Control": "no-store"})
 
 
+@app.route("/slide/<name>")
+def slide(name):
+    """/slide/<hash>.jpg, or a variant: /slide/<hash>-<width>.<jpg|webp>."""
+    status, headers, data = slide_response(name, request.if_none_match.contains)
+    return Response(data, status=status, headers=headers)
+
+
+def slide_response(name: str, etag_matches) -> tuple[int, dict, bytes]:
+    """(status, headers, body) for /slide/<name>; etag_matches(etag) checks If-None-Match.
+
+    Shared by the Flask route and the asyncio server. May encode a variant, so
+    it can take tens of milliseconds on a first request.
+    """
+    match = _SLIDE_NAME.fullmatch(name)
+    if match is None:
+        return 404, {}, b""
+    slide_id, width, ext = match.groups()
+    with _image_lock:
+        known = slide_id in _slides
+    if not known:
+        return 404, {}, b""
+    # The URL names the content (hash, width, format), so it can never change
+    headers = {
+        "ETag": f'"{name}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if etag_matches(name):
+        return 304, headers, b""
+    data = _slide_variant(slide_id, int(width) if width else None, ext)
+    if data is None:
+        return 404, {}, b""
+    headers["Content-Type"] = _VARIANT_FORMATS[ext][1]
+    return 200, headers, data
+
+
+def current_image() -> bytes | None:
+    """JPEG bytes of the slide on screen, or None when idle."""
+    with _image_lock:
+        return _current_image_bytes
+
+
+def current_frame() -> bytes:
+    """The SSE event describing the slide on screen, for a newly connected client."""
+    with _image_lock:
+        return _current_frame
+
+
+def add_subscriber(sink) -> None:
+    """Receive every new SSE frame through sink.put_nowait(frame), on the encoder thread.
+
+    put_nowait must not block; it may raise queue.Full to skip a frame.
+    """
+    with _subscribers_lock:
+        _subscribers.append(sink)
+
+
+def remove_subscriber(sink) -> None:
+    with _subscribers_lock, contextlib.suppress(ValueError):
+        _subscribers.remove(sink)
+
+
 @app.route("/stream")
 def stream():
     q: queue.Queue = queue.Queue(maxsize=10)
-    with _subscribers_lock:
-        _subscribers.append(q)
+    add_subscriber(q)
 
     def generate():
         # Send current state immediately on connect
-        with _image_lock:
-            b64 = base64.b64encode(_current_image_bytes).decode() if _current_image_bytes else None
-            payload = {"type": _current_type, "title": _current_title, "image": b64}
-        yield f"data: {json.dumps(payload)}\n\n"
+        yield current_frame()
         while True:
             try:
-                payload = q.get(timeout=25)
-                yield f"data: {json.dumps(payload)}\n\n"
+                yield q.get(timeout=25)
             except queue.Empty:
-                yield ": heartbeat\n\n"
+                yield _HEARTBEAT
 
     def guarded_generate():
         try:
             yield from generate()
         finally:
-            with _subscribers_lock:
-                try:
-                    _subscribers.remove(q)
-                except ValueError:
-                    pass
+            remove_subscriber(q)
 
     return Response(
         guarded_generate(),